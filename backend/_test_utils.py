@@ -0,0 +1,373 @@
+"""
+Shared helpers for the end-to-end test scripts: HTTP client, server check, command-line
+handling, uploads, and the on-disk result cache.
+
+Results of expensive server calls are cached on disk, keyed by the SHA-256 of the
+uploaded file plus the request options, so re-running a script while iterating
+doesn't repeat identical server-side work. Pass --no-cache to a script to bypass it.
+
+Inputs are also shrunk with ffmpeg before upload (videos downscaled to 480p, audio
+re-encoded as Opus); the transcoded files are cached the same way, by source hash and preset.
+"""
+
+import asyncio
+import hashlib
+import http.client
+import json
+import mimetypes
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Coroutine, Dict, List, Optional, Sequence
+from urllib.parse import urlencode, urlsplit
+
+import httpx
+
+BASE_URL = "http://localhost:8000"
+
+CACHE_DIR = Path.home() / ".cache" / "micdrop_tests"
+
+# Scripts turn this off when run with --no-cache
+CACHE_ENABLED = True
+
+# Scripts turn this off when run with --full-res
+DOWNSCALE_VIDEO = True
+
+# Scripts turn this off when run with --no-preencode
+PREENCODE_AUDIO = True
+
+# Scripts turn this on with --strict to check liveness via HTTP /health instead of a TCP probe
+STRICT_HEALTH = False
+
+# 480p H.264 (never upscaled); audio is kept since the analysis listens to it
+VIDEO_480P_PRESET = [
+    "-vf", "scale=-2:'min(480,ih)'",
+    "-c:v", "libx264", "-preset", "veryfast", "-crf", "28",
+    "-c:a", "aac", "-b:a", "64k", "-ac", "1",
+]
+
+# 24 kbps mono Opus: enough for speech recognition and voice cloning, a fraction of an MP3's size
+AUDIO_OPUS_PRESET = ["-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "24k"]
+
+
+# Flags every script accepts, for usage messages
+FLAGS_USAGE = "[--no-cache] [--full-res] [--no-preencode] [--strict]"
+
+
+def parse_flags() -> None:
+    """Apply the shared command-line flags, removing them from sys.argv."""
+    global CACHE_ENABLED, DOWNSCALE_VIDEO, PREENCODE_AUDIO, STRICT_HEALTH
+    CACHE_ENABLED = not pop_flag("--no-cache")
+    DOWNSCALE_VIDEO = not pop_flag("--full-res")
+    PREENCODE_AUDIO = not pop_flag("--no-preencode")
+    STRICT_HEALTH = pop_flag("--strict")
+
+
+def parse_audio_arg(usage: str, examples: Sequence[str] = (), notes: Sequence[str] = ()) -> str:
+    """
+    Return the audio file given as the first argument, or prompt for one.
+    
+    Args:
+        usage: Usage line without the shared flags, e.g. "python test_transcribe.py <audio_file>"
+        examples: Example command lines printed before prompting
+        notes: Extra lines (e.g. requirements) printed before prompting
+    """
+    if len(sys.argv) > 1:
+        return sys.argv[1]
+    
+    print(f"Usage: {usage} {FLAGS_USAGE}")
+    if examples:
+        print("\nExample:")
+        for example in examples:
+            print(f"  {example}")
+    for note in notes:
+        print(note)
+    audio_file = input("\nAudio file path (or Enter to skip): ").strip()
+    if not audio_file:
+        print("No audio file provided. Exiting.")
+        sys.exit(0)
+    return audio_file
+
+
+def print_header(title: str) -> None:
+    print("="*60)
+    print(title)
+    print("="*60)
+
+
+def run(main: Coroutine) -> Any:
+    """Run a script's async main(), on uvloop when it is installed (cheaper per-syscall event loop)."""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(main)
+    return uvloop.run(main)
+
+
+def make_client(timeout: float = 300.0) -> httpx.AsyncClient:
+    """Create the AsyncClient shared by every test in a run (keep-alive connections, one timeout policy)."""
+    # Disable Nagle so small requests (polls, health checks) aren't held back waiting for ACKs
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+        socket_options=[(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)],
+    )
+    return httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(timeout))
+
+
+def is_up(base_url: str, timeout: float = 0.1) -> bool:
+    """Cheap liveness probe: whether a TCP connection to the server can be opened."""
+    parts = urlsplit(base_url)
+    try:
+        with socket.create_connection((parts.hostname, parts.port or 80), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+async def server_ready(client: httpx.AsyncClient, base_url: str) -> bool:
+    """Whether the server is accepting requests: a TCP probe, or GET /health with --strict."""
+    if not STRICT_HEALTH:
+        return is_up(base_url)
+    try:
+        response = await client.get(f"{base_url}/health", timeout=5)
+    except httpx.HTTPError:
+        return False
+    return response.status_code == 200
+
+
+async def wait_for_server(client: httpx.AsyncClient, base_url: str = BASE_URL, timeout: float = 5.0) -> bool:
+    """Wait up to timeout seconds for the server to accept requests (e.g. while uvicorn --reload restarts)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not await server_ready(client, base_url):
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(0.2)
+    return True
+
+
+async def ensure_server(client: httpx.AsyncClient) -> None:
+    """Exit with start-up instructions unless the server at BASE_URL is reachable."""
+    if not await wait_for_server(client):
+        print("❌ Server not running at", BASE_URL)
+        print("\nStart the server with:")
+        print("  cd backend && uvicorn main:app --reload")
+        sys.exit(1)
+    print("✅ Server is running\n")
+
+
+async def post_file(
+    client: httpx.AsyncClient,
+    url: str,
+    path: str,
+    field: str = "audio",
+    timeout: Any = httpx.USE_CLIENT_DEFAULT,
+    **data: str,
+) -> httpx.Response:
+    """POST a file as multipart/form-data (streamed from disk), with any extra form fields."""
+    with open(path, 'rb') as f:
+        return await client.post(
+            url,
+            files={field: (Path(path).name, f, audio_content_type(path))},
+            data=data or None,
+            timeout=timeout
+        )
+
+
+async def stream_file(path: str, chunk_size: int = 1 << 20) -> AsyncIterator[bytes]:
+    """Yield a file in chunks, for sending it as a raw (chunked) request body."""
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def audio_content_type(path: str) -> str:
+    """Guess the Content-Type for a raw audio upload from its extension."""
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+# Uncompressed waveform formats worth compressing; MP3/M4A/FLAC/MP4 are already compressed
+ZSTD_EXTENSIONS = {".wav", ".pcm"}
+
+
+def wants_zstd(path: str) -> bool:
+    """Whether raw_upload would zstd-compress this file (waveform input and zstandard installed)."""
+    if Path(path).suffix.lower() not in ZSTD_EXTENSIONS:
+        return False
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def raw_upload(path: str, data: Optional[bytes] = None):
+    """
+    Return (content, headers) for sending an audio file as a raw request body.
+    
+    Uncompressed waveform files are sent zstd-compressed (Content-Encoding: zstd) when the
+    optional zstandard package is installed; everything else is streamed as-is. Pass data
+    if the file's bytes have already been read.
+    """
+    headers = {"Content-Type": audio_content_type(path)}
+    if wants_zstd(path):
+        import zstandard
+        if data is None:
+            data = Path(path).read_bytes()
+        headers["Content-Encoding"] = "zstd"
+        return zstandard.ZstdCompressor(level=3).compress(data), headers
+    return (data if data is not None else stream_file(path)), headers
+
+
+def sendfile_post(
+    url: str,
+    path: str,
+    params: Optional[Dict[str, str]] = None,
+    file_field: Optional[str] = None,
+    fields: Optional[Dict[str, str]] = None,
+    content_type: str = "application/octet-stream",
+    timeout: float = 300.0,
+) -> httpx.Response:
+    """
+    POST a file with socket.sendfile(), so the kernel copies it from the page cache straight
+    to the socket instead of bouncing every byte through Python.
+    
+    With file_field the body is multipart/form-data (plus any extra form fields); otherwise the
+    file is sent as the raw body. Blocking: call it via asyncio.to_thread from async tests.
+    """
+    if file_field:
+        boundary = uuid.uuid4().hex
+        head = "".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in (fields or {}).items()
+        )
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{Path(path).name}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        )
+        head_bytes, tail_bytes = head.encode(), f"\r\n--{boundary}--\r\n".encode()
+        body_type = f"multipart/form-data; boundary={boundary}"
+    else:
+        head_bytes, tail_bytes, body_type = b"", b"", content_type
+    
+    parts = urlsplit(url)
+    target = (parts.path or "/") + (f"?{urlencode(params)}" if params else "")
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        conn.putrequest("POST", target)
+        conn.putheader("Content-Type", body_type)
+        conn.putheader("Content-Length", str(len(head_bytes) + os.path.getsize(path) + len(tail_bytes)))
+        conn.endheaders()
+        conn.send(head_bytes)
+        with open(path, "rb") as f:
+            conn.sock.sendfile(f)
+        conn.send(tail_bytes)
+        
+        response = conn.getresponse()
+        return httpx.Response(response.status, headers=response.getheaders(), content=response.read())
+    finally:
+        conn.close()
+
+
+def pop_flag(flag: str) -> bool:
+    """Remove a flag such as '--no-cache' from sys.argv, returning whether it was present."""
+    if flag in sys.argv:
+        sys.argv.remove(flag)
+        return True
+    return False
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(*parts: str) -> str:
+    """Build a filesystem-safe cache key from request parts (file hash, endpoint, options)."""
+    return hashlib.sha256(":".join(parts).encode()).hexdigest()
+
+
+def transcode_cached(src: str, preset: List[str], suffix: str) -> str:
+    """
+    Transcode src with ffmpeg using the given output options, once per (source hash, preset).
+    
+    Returns the path of the cached output, or src itself if ffmpeg is missing or fails, so
+    callers can always upload whatever path comes back.
+    """
+    if shutil.which("ffmpeg") is None:
+        print("⚠️  ffmpeg not found; uploading the original file")
+        return src
+    
+    out = CACHE_DIR / f"{cache_key(file_sha256(src), *preset)}{suffix}"
+    if out.exists():
+        return str(out)
+    
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Write under a unique temporary name so an interrupted run never leaves a truncated cache
+    # entry and concurrent callers (run_all_tests.py) don't write over each other's output
+    tmp = out.with_name(f"tmp_{uuid.uuid4().hex}_{out.name}")
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", src, *preset, str(tmp)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        tmp.unlink(missing_ok=True)
+        if out.exists():
+            return str(out)
+        print(f"⚠️  ffmpeg failed ({result.stderr.strip()[:200]}); uploading the original file")
+        return src
+    # Atomic rename: if another caller got there first, its identical output is simply replaced
+    tmp.replace(out)
+    return str(out)
+
+
+def downscale_video(path: str) -> str:
+    """Return a cached 480p copy of a video for upload, or the original with --full-res."""
+    if not DOWNSCALE_VIDEO:
+        return path
+    return transcode_cached(path, VIDEO_480P_PRESET, ".mp4")
+
+
+def preencode_audio(path: str) -> str:
+    """Return a cached 24 kbps Opus copy of an audio file for upload, or the original with --no-preencode."""
+    if not PREENCODE_AUDIO:
+        return path
+    return transcode_cached(path, AUDIO_OPUS_PRESET, ".opus")
+
+
+def cache_get_json(key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached JSON result, or None on a miss or when caching is disabled."""
+    path = CACHE_DIR / f"{key}.json"
+    if not CACHE_ENABLED or not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def cache_put_json(key: str, value: Dict[str, Any]) -> None:
+    if not CACHE_ENABLED:
+        return
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    (CACHE_DIR / f"{key}.json").write_text(json.dumps(value))
+
+
+def cache_get_bytes(key: str) -> Optional[bytes]:
+    """Return a cached binary result (e.g. generated audio), or None on a miss or when disabled."""
+    path = CACHE_DIR / f"{key}.bin"
+    if not CACHE_ENABLED or not path.exists():
+        return None
+    return path.read_bytes()
+
+
+def cache_put_bytes(key: str, value: bytes) -> None:
+    if not CACHE_ENABLED:
+        return
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    (CACHE_DIR / f"{key}.bin").write_bytes(value)
@@ -19,6 +19,9 @@ ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 if not ELEVENLABS_API_KEY:
     raise ValueError("ELEVENLABS_API_KEY not set in environment")
 
+# Optional Redis URL for sharing the analysis response cache across workers
+REDIS_URL = os.getenv("REDIS_URL")
+
 # Model configuration
 GEMINI_MODEL = "gemini-2.5-flash"
 #GEMINI_MODEL = "gemini-2.5-pro" 
@@ -28,6 +31,10 @@ GENERATION_CONFIG = {
     "top_k": 40,
     "max_output_tokens": 8192,
 }
+# Maximum number of Gemini upload/generate operations in flight per process
+MAX_CONCURRENT_GEMINI = int(os.getenv("MAX_CONCURRENT_GEMINI", "8"))
+# Largest size a Content-Encoding: zstd upload may decompress to (default 512 MiB)
+MAX_DECOMPRESSED_UPLOAD_BYTES = int(os.getenv("MAX_DECOMPRESSED_UPLOAD_BYTES", str(512 << 20)))
 
 # ElevenLabs configuration
 ELEVENLABS_VOICE_SETTINGS = {
@@ -54,6 +54,27 @@ class FeedbackResponse(BaseModel):
     content: ContentFeedback
     overall_feedback: OverallFeedback
 
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="One of: pending, running, done, error")
+    result: Optional[FeedbackResponse] = None
+    error: Optional[str] = None
+
+class UploadCreateResponse(BaseModel):
+    upload_id: str
+
+class UploadPartResponse(BaseModel):
+    part_number: int
+    size: int
+
+class UploadCompleteResponse(BaseModel):
+    upload_id: str
+    size: int
+
 class ChatStartResponse(BaseModel):
     conversation_id: str
     message: str
@@ -78,6 +99,13 @@ class SpeechImprovement(BaseModel):
 class TranscriptionResponse(BaseModel):
     original_transcription: str
     
+class LanguageTranscription(BaseModel):
+    language_code: Optional[str] = Field(None, description="Language hint used, or null for auto-detect")
+    original_transcription: str
+
+class BatchTranscriptionResponse(BaseModel):
+    transcriptions: List[LanguageTranscription]
+
 class ImprovementResponse(BaseModel):
     original_transcription: str
     improved_content: SpeechImprovement
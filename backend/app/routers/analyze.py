@@ -1,23 +1,52 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Query
 from fastapi.responses import JSONResponse
+from starlette.datastructures import UploadFile as StarletteUploadFile
+import aiofiles
+import asyncio
 import logging
-import shutil
+import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Dict, Optional, Set, Union
 
 from app.config import UPLOADS_DIR
 from app.services.analyzer import SpeechAnalyzer
-from app.models import FeedbackResponse
+from app.services.uploads import upload_store
+from app.models import FeedbackResponse, JobSubmitResponse, JobStatusResponse
 
 router = APIRouter(prefix="/analyze", tags=["Analysis"])
 logger = logging.getLogger(__name__)
 
 analyzer = SpeechAnalyzer()
 
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# In-memory job store for /analyze/jobs; the oldest finished jobs are evicted past this size
+MAX_JOBS = 256
+
+jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# Strong references so running job tasks aren't garbage collected mid-flight
+_job_tasks: Set[asyncio.Task] = set()
+
+
+def uploaded_file(value: Union[UploadFile, str, None]) -> Optional[UploadFile]:
+    """Return the form value if it is an uploaded file with a name; empty strings and None give None."""
+    # FastAPI hands over Starlette's UploadFile, which is a base class of fastapi.UploadFile
+    if isinstance(value, StarletteUploadFile) and value.filename:
+        return value
+    return None
+
+async def save_upload(upload: UploadFile, path: Path) -> None:
+    """Stream an uploaded file to disk in chunks without blocking the event loop."""
+    async with aiofiles.open(path, "wb") as buffer:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            await buffer.write(chunk)
+
 @router.post("/video", response_model=FeedbackResponse)
 async def analyze_video(
     video: UploadFile = File(..., description="Video file to analyze"),
-    audio: Union[UploadFile, str, None] = File(None, description="Optional separate audio file")
+    audio: Union[UploadFile, str, None] = File(None, description="Optional separate audio file"),
+    dryrun: bool = Query(False, description="Only validate the request parameters; nothing is saved or analyzed")
 ):
     """
     Analyze a speech video and return structured feedback following the general_prompt.txt schema.
@@ -27,6 +56,8 @@ async def analyze_video(
     - delivery: clarity_enunciation, intonation, eloquence_filler_words
     - content: organization_flow, persuasiveness_impact, clarity_of_message
     - overall_feedback: summary, strengths, areas_to_improve, prioritized_actions
+    
+    With ?dryrun=1 the form is validated and {"ok": true, ...} is returned immediately.
     """
     video_path = None
     audio_path = None
@@ -38,21 +69,23 @@ async def analyze_video(
         
         # Handle audio - it might be a string, None, or UploadFile
         # Only process if it's actually an UploadFile with a filename
-        audio_file = None
-        if isinstance(audio, UploadFile) and hasattr(audio, 'filename') and audio.filename:
-            audio_file = audio
+        audio_file = uploaded_file(audio)
+        
+        if dryrun:
+            return JSONResponse(content={"ok": True, "video": video.filename, "audio": audio_file is not None})
+        
+        # Request-scoped names: concurrent uploads with the same filename must not share a file
+        request_id = uuid.uuid4().hex
         
         # Save uploaded video
-        video_path = UPLOADS_DIR / f"video_{video.filename}"
-        with video_path.open("wb") as buffer:
-            shutil.copyfileobj(video.file, buffer)
+        video_path = UPLOADS_DIR / f"video_{request_id}_{Path(video.filename).name}"
+        await save_upload(video, video_path)
         logger.info(f"Saved video to {video_path}")
         
         # Save audio if provided (and is actually a file)
         if audio_file:
-            audio_path = UPLOADS_DIR / f"audio_{audio_file.filename}"
-            with audio_path.open("wb") as buffer:
-                shutil.copyfileobj(audio_file.file, buffer)
+            audio_path = UPLOADS_DIR / f"audio_{request_id}_{Path(audio_file.filename).name}"
+            await save_upload(audio_file, audio_path)
             logger.info(f"Saved audio to {audio_path}")
         
         # Analyze
@@ -75,3 +108,98 @@ async def analyze_video(
             video_path.unlink()
         if audio_path and audio_path.exists():
             audio_path.unlink()
+
+
+def _prune_jobs() -> None:
+    """Drop the oldest finished jobs once the store exceeds MAX_JOBS (running jobs are kept)."""
+    excess = len(jobs) - MAX_JOBS
+    if excess <= 0:
+        return
+    for job_id in [jid for jid, job in jobs.items() if job["status"] in ("done", "error")][:excess]:
+        del jobs[job_id]
+
+
+async def _run_job(job_id: str, video_path: Path, audio_path: Optional[Path]) -> None:
+    """Run one analysis job in the background, recording its outcome and cleaning up its files."""
+    job = jobs[job_id]
+    job["status"] = "running"
+    try:
+        job["result"] = await analyzer.analyze_video(
+            str(video_path),
+            str(audio_path) if audio_path else None
+        )
+        job["status"] = "done"
+    except Exception as e:
+        logger.error(f"Analysis job {job_id} failed: {e}")
+        job["error"] = str(e)
+        job["status"] = "error"
+    finally:
+        if video_path.exists():
+            video_path.unlink()
+        if audio_path and audio_path.exists():
+            audio_path.unlink()
+
+
+@router.post("/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_analysis_job(
+    video: Union[UploadFile, str, None] = File(None, description="Video file to analyze (or pass upload_id)"),
+    audio: Union[UploadFile, str, None] = File(None, description="Optional separate audio file"),
+    upload_id: Optional[str] = Form(None, description="ID of a completed /uploads multipart upload to use as the video")
+):
+    """
+    Submit a video for analysis without holding the connection open.
+    
+    Accepts the same form fields as /analyze/video and returns a job_id immediately;
+    poll GET /analyze/jobs/{job_id} until the status is "done" or "error".
+    Large videos can be sent through /uploads first and referenced by upload_id.
+    """
+    video_file = uploaded_file(video)
+    if not video_file and not upload_id:
+        raise HTTPException(status_code=400, detail="Video file or upload_id is required")
+    
+    audio_file = uploaded_file(audio)
+    
+    job_id = uuid.uuid4().hex
+    # Job-scoped names so concurrent jobs with the same filename don't collide
+    audio_path = UPLOADS_DIR / f"job_{job_id}_audio_{audio_file.filename}" if audio_file else None
+    if upload_id:
+        try:
+            video_path = upload_store.take(upload_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    else:
+        video_path = UPLOADS_DIR / f"job_{job_id}_video_{video_file.filename}"
+    
+    try:
+        if not upload_id:
+            await save_upload(video_file, video_path)
+        if audio_file:
+            await save_upload(audio_file, audio_path)
+    except Exception as e:
+        logger.error(f"Failed to save upload for job {job_id}: {e}")
+        for path in (video_path, audio_path):
+            if path and path.exists():
+                path.unlink()
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    
+    jobs[job_id] = {"status": "pending", "result": None, "error": None}
+    _prune_jobs()
+    
+    # The task owns the saved files from here on and deletes them when it finishes
+    task = asyncio.create_task(_run_job(job_id, video_path, audio_path))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    
+    logger.info(f"Queued analysis job {job_id}")
+    return JobSubmitResponse(job_id=job_id, status="pending")
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_analysis_job(job_id: str):
+    """Return the status of an analysis job, with the feedback once it is done."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatusResponse(job_id=job_id, **job)
@@ -1,15 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Query, Request
 from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+import aiofiles
 import logging
 import shutil
+import uuid
 from pathlib import Path
 from typing import Optional
-import io
 
-from app.config import UPLOADS_DIR
+from app.config import MAX_DECOMPRESSED_UPLOAD_BYTES, UPLOADS_DIR
 from app.services.elevenlabs_service import ElevenLabsService
 from app.models import (
     TranscriptionResponse,
+    BatchTranscriptionResponse,
+    LanguageTranscription,
     ImprovementResponse,
     FullWorkflowResponse
 )
@@ -19,6 +23,28 @@ logger = logging.getLogger(__name__)
 
 elevenlabs_service = ElevenLabsService()
 
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Most language hints /speech/transcribe/batch will run for one upload
+MAX_BATCH_LANGUAGES = 5
+
+# File extension for raw-body uploads that don't pass a filename
+_AUDIO_EXTENSIONS = {
+    "audio/mpeg": ".mp3",
+    "audio/mp3": ".mp3",
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/wave": ".wav",
+    "audio/mp4": ".m4a",
+    "audio/x-m4a": ".m4a",
+    "audio/aac": ".aac",
+    "audio/flac": ".flac",
+    "audio/x-flac": ".flac",
+    "audio/ogg": ".ogg",
+    "audio/opus": ".opus",
+    "audio/webm": ".webm",
+}
+
 
 def normalize_language_code(code: Optional[str]) -> Optional[str]:
     """Convert empty string, whitespace, string 'None', or 'string' to None for auto-detect."""
@@ -46,6 +72,63 @@ def normalize_optional_string(value: Optional[str]) -> Optional[str]:
     return value
 
 
+def upload_path(filename: str, kind: str = "audio") -> Path:
+    """Pick a request-scoped upload path, so concurrent uploads with the same filename never share a file."""
+    return UPLOADS_DIR / f"{kind}_{uuid.uuid4().hex}_{Path(filename).name}"
+
+
+def raw_upload_path(request: Request, filename: Optional[str]) -> Path:
+    """Pick a unique upload path for a raw request body, keeping an extension the STT API can use."""
+    if not filename:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        filename = "upload" + _AUDIO_EXTENSIONS.get(content_type, ".mp3")
+    return upload_path(filename)
+
+
+def _zstd_decompressor():
+    """Streaming zstd decompressor; zstandard is an optional dependency, only needed for compressed uploads."""
+    try:
+        import zstandard
+    except ImportError:
+        raise HTTPException(status_code=415, detail="Content-Encoding: zstd requires the 'zstandard' package on the server")
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+async def save_raw_body(request: Request, path: Path) -> None:
+    """Stream a raw (non-multipart) request body to disk as it arrives, decoding Content-Encoding: zstd."""
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding == "zstd":
+        decompressor = _zstd_decompressor()
+    elif encoding == "identity":
+        decompressor = None
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+    
+    size = 0
+    async with aiofiles.open(path, "wb") as buffer:
+        async for chunk in request.stream():
+            # The stream ends with an empty chunk, which the decompressor rejects once the frame is done
+            if not chunk:
+                continue
+            if decompressor:
+                try:
+                    chunk = decompressor.decompress(chunk)
+                except Exception as e:
+                    raise HTTPException(status_code=400, detail=f"Invalid zstd request body: {e}")
+                # A few KB of zstd can expand to gigabytes, so cap what gets written to disk
+                if size + len(chunk) > MAX_DECOMPRESSED_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"zstd request body decompresses to more than {MAX_DECOMPRESSED_UPLOAD_BYTES} bytes"
+                    )
+            size += len(chunk)
+            await buffer.write(chunk)
+    if decompressor and not decompressor.eof:
+        raise HTTPException(status_code=400, detail="Invalid zstd request body: frame is truncated")
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Request body is empty; send the audio bytes as the body")
+
+
 @router.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe_audio(
     audio: UploadFile = File(..., description="Audio file to transcribe"),
@@ -63,7 +146,7 @@ async def transcribe_audio(
     
     try:
         # Save uploaded audio
-        audio_path = UPLOADS_DIR / f"audio_{audio.filename}"
+        audio_path = upload_path(audio.filename)
         with audio_path.open("wb") as buffer:
             shutil.copyfileobj(audio.file, buffer)
         logger.info(f"Saved audio to {audio_path}")
@@ -89,6 +172,98 @@ async def transcribe_audio(
             audio_path.unlink()
 
 
+@router.post("/transcribe/raw", response_model=TranscriptionResponse)
+async def transcribe_audio_raw(
+    request: Request,
+    filename: Optional[str] = Query(default=None, description="Original filename, used for its extension"),
+    language_code: Optional[str] = Query(default="", description="Language code (e.g., 'eng', 'spa') or leave empty for auto-detect"),
+    diarize: bool = Query(default=False, description="Whether to annotate who is speaking"),
+    tag_audio_events: bool = Query(default=False, description="Tag audio events like laughter, applause, etc.")
+):
+    """
+    Same as /speech/transcribe, but the audio is the raw request body (e.g. Content-Type: audio/mpeg)
+    and options are query parameters. Avoids multipart encoding and accepts chunked uploads.
+    """
+    audio_path = None
+    
+    try:
+        audio_path = raw_upload_path(request, filename)
+        await save_raw_body(request, audio_path)
+        logger.info(f"Saved audio to {audio_path}")
+        
+        transcription = await elevenlabs_service.transcribe_audio(
+            str(audio_path),
+            language_code=normalize_language_code(language_code),
+            diarize=diarize,
+            tag_audio_events=tag_audio_events
+        )
+        
+        return TranscriptionResponse(
+            original_transcription=transcription
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Transcription failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+    finally:
+        # Cleanup
+        if audio_path and audio_path.exists():
+            audio_path.unlink()
+
+
+@router.post("/transcribe/batch", response_model=BatchTranscriptionResponse)
+async def transcribe_audio_batch(
+    request: Request,
+    language_codes: str = Query(default="auto", description="Comma-separated language codes, e.g. 'auto,eng'; 'auto' means auto-detect"),
+    filename: Optional[str] = Query(default=None, description="Original filename, used for its extension"),
+    diarize: bool = Query(default=False, description="Whether to annotate who is speaking"),
+    tag_audio_events: bool = Query(default=False, description="Tag audio events like laughter, applause, etc.")
+):
+    """
+    Transcribe one upload under several language hints in a single request.
+    
+    The audio is the raw request body (as for /speech/transcribe/raw) and is stored once;
+    the transcriptions run concurrently and are returned in the order requested.
+    """
+    codes = [
+        None if code.strip().lower() == "auto" else normalize_language_code(code)
+        for code in language_codes.split(",")
+    ]
+    if len(codes) > MAX_BATCH_LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_LANGUAGES} language codes per request")
+    
+    audio_path = None
+    
+    try:
+        audio_path = raw_upload_path(request, filename)
+        await save_raw_body(request, audio_path)
+        logger.info(f"Saved audio to {audio_path}")
+        
+        transcriptions = await elevenlabs_service.transcribe_audio_batch(
+            str(audio_path),
+            codes,
+            diarize=diarize,
+            tag_audio_events=tag_audio_events
+        )
+        
+        return BatchTranscriptionResponse(transcriptions=[
+            LanguageTranscription(language_code=code, original_transcription=text)
+            for code, text in zip(codes, transcriptions)
+        ])
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch transcription failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+    finally:
+        # Cleanup
+        if audio_path and audio_path.exists():
+            audio_path.unlink()
+
+
 @router.post("/improve", response_model=ImprovementResponse)
 async def improve_speech(
     audio: UploadFile = File(..., description="Audio file to transcribe and improve"),
@@ -107,7 +282,7 @@ async def improve_speech(
     
     try:
         # Save uploaded audio
-        audio_path = UPLOADS_DIR / f"audio_{audio.filename}"
+        audio_path = upload_path(audio.filename)
         with audio_path.open("wb") as buffer:
             shutil.copyfileobj(audio.file, buffer)
         logger.info(f"Saved audio to {audio_path}")
@@ -140,6 +315,37 @@ async def improve_speech(
             audio_path.unlink()
 
 
+async def stream_improved_speech(
+    audio_path: Path,
+    improvement_focus: Optional[str],
+    language_code: Optional[str],
+    diarize: bool,
+    tag_audio_events: bool
+) -> StreamingResponse:
+    """Run the clone-and-improve workflow on a saved file and stream the generated MP3 back."""
+    # Audio is generated while it streams out
+    result = await elevenlabs_service.streaming_speech_improvement_workflow(
+        str(audio_path),
+        normalize_optional_string(improvement_focus),
+        language_code=normalize_language_code(language_code),
+        diarize=diarize,
+        tag_audio_events=tag_audio_events
+    )
+    
+    # The voice is already cloned, so the uploaded file can be cleaned up before streaming ends
+    audio_stream = result["improved_audio_stream"]
+    return StreamingResponse(
+        audio_stream,
+        media_type="audio/mpeg",
+        # Runs after the body is sent or the client disconnects; deletes the voice even if streaming never began
+        background=BackgroundTask(audio_stream.close),
+        headers={
+            "Content-Disposition": f"attachment; filename=improved_speech.mp3",
+            "X-Transcription-Length": str(len(result["original_transcription"]))
+        }
+    )
+
+
 @router.post("/clone-and-improve")
 async def clone_voice_and_improve(
     audio: UploadFile = File(..., description="Audio file to clone voice from"),
@@ -157,33 +363,58 @@ async def clone_voice_and_improve(
     
     try:
         # Save uploaded audio
-        audio_path = UPLOADS_DIR / f"audio_{audio.filename}"
+        audio_path = upload_path(audio.filename)
         with audio_path.open("wb") as buffer:
             shutil.copyfileobj(audio.file, buffer)
         logger.info(f"Saved audio to {audio_path}")
         
-        # Run full workflow with optional parameters
-        result = await elevenlabs_service.full_speech_improvement_workflow(
-            str(audio_path),
-            normalize_optional_string(improvement_focus),
-            language_code=normalize_language_code(language_code),
-            diarize=diarize,
-            tag_audio_events=tag_audio_events
+        return await stream_improved_speech(
+            audio_path,
+            improvement_focus,
+            language_code,
+            diarize,
+            tag_audio_events
         )
         
-        # Return audio as streaming response
-        audio_stream = io.BytesIO(result["improved_audio_bytes"])
+    except Exception as e:
+        logger.error(f"Clone and improve workflow failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Workflow failed: {str(e)}")
+    finally:
+        # Cleanup
+        if audio_path and audio_path.exists():
+            audio_path.unlink()
+
+
+@router.post("/clone-and-improve/raw")
+async def clone_voice_and_improve_raw(
+    request: Request,
+    filename: Optional[str] = Query(default=None, description="Original filename, used for its extension"),
+    improvement_focus: Optional[str] = Query(default="", description="Optional focus areas for improvement (e.g., 'clarity', 'pacing'). Leave empty for general improvement"),
+    language_code: Optional[str] = Query(default="", description="Language code (e.g., 'eng', 'spa') or leave empty for auto-detect"),
+    diarize: bool = Query(default=False, description="Whether to annotate who is speaking"),
+    tag_audio_events: bool = Query(default=False, description="Tag audio events like laughter, applause, etc.")
+):
+    """
+    Same as /speech/clone-and-improve, but the audio is the raw request body (e.g. Content-Type: audio/mpeg)
+    and options are query parameters. Avoids multipart encoding and accepts chunked uploads.
+    """
+    audio_path = None
+    
+    try:
+        audio_path = raw_upload_path(request, filename)
+        await save_raw_body(request, audio_path)
+        logger.info(f"Saved audio to {audio_path}")
         
-        return StreamingResponse(
-            audio_stream,
-            media_type="audio/mpeg",
-            headers={
-                "Content-Disposition": f"attachment; filename=improved_speech.mp3",
-                "X-Audio-Size": str(result["audio_size"]),
-                "X-Transcription-Length": str(len(result["original_transcription"]))
-            }
+        return await stream_improved_speech(
+            audio_path,
+            improvement_focus,
+            language_code,
+            diarize,
+            tag_audio_events
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Clone and improve workflow failed: {e}")
         raise HTTPException(status_code=500, detail=f"Workflow failed: {str(e)}")
@@ -209,7 +440,7 @@ async def clone_voice_and_improve_detailed(
     
     try:
         # Save uploaded audio
-        audio_path = UPLOADS_DIR / f"audio_{audio.filename}"
+        audio_path = upload_path(audio.filename)
         with audio_path.open("wb") as buffer:
             shutil.copyfileobj(audio.file, buffer)
         logger.info(f"Saved audio to {audio_path}")
@@ -262,7 +493,7 @@ async def generate_ideal_speech_from_video(
     
     try:
         # Save uploaded video
-        video_path = UPLOADS_DIR / f"video_{video.filename}"
+        video_path = upload_path(video.filename, "video")
         with video_path.open("wb") as buffer:
             shutil.copyfileobj(video.file, buffer)
         logger.info(f"Saved video to {video_path}")
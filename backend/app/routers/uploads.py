@@ -0,0 +1,62 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+import logging
+from typing import Optional
+
+from app.services.uploads import upload_store
+from app.models import UploadCreateResponse, UploadPartResponse, UploadCompleteResponse
+
+router = APIRouter(prefix="/uploads", tags=["Uploads"])
+logger = logging.getLogger(__name__)
+
+
+@router.post("", response_model=UploadCreateResponse, status_code=201)
+async def create_upload(
+    filename: str = Query(..., description="Name of the file being uploaded (its extension is kept)")
+):
+    """
+    Start a multipart upload for a large file.
+
+    PUT the file's parts (any order, in parallel) to /uploads/{upload_id}/parts/{n}, numbered
+    from 0, then POST /uploads/{upload_id}/complete. Pass the upload_id to /analyze/jobs.
+    """
+    upload_id = upload_store.create(filename)
+    logger.info(f"Started upload {upload_id} for {filename}")
+    return UploadCreateResponse(upload_id=upload_id)
+
+
+@router.put("/{upload_id}/parts/{part_number}", response_model=UploadPartResponse)
+async def upload_part(upload_id: str, part_number: int, request: Request):
+    """Store one part of an upload, sent as the raw request body. Re-sending a part replaces it."""
+    try:
+        size = await upload_store.write_part(upload_id, part_number, request.stream())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return UploadPartResponse(part_number=part_number, size=size)
+
+
+@router.post("/{upload_id}/complete", response_model=UploadCompleteResponse)
+async def complete_upload(
+    upload_id: str,
+    part_count: Optional[int] = Query(default=None, description="Number of parts sent, to catch missing parts")
+):
+    """Assemble the uploaded parts into the final file."""
+    try:
+        size = await upload_store.complete(upload_id, part_count)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return UploadCompleteResponse(upload_id=upload_id, size=size)
+
+
+@router.delete("/{upload_id}", status_code=204)
+async def abort_upload(upload_id: str):
+    """Abandon an upload and delete any parts received so far."""
+    try:
+        upload_store.abort(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
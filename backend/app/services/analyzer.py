@@ -1,20 +1,100 @@
-from google import genai
+import asyncio
+import hashlib
 import logging
+import mimetypes
+import orjson
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-from app.config import GOOGLE_AI_STUDIO_API_KEY, GEMINI_MODEL, PROMPTS_DIR
+from app.config import GEMINI_MODEL, PROMPTS_DIR, REDIS_URL
 from app.models import FeedbackResponse
+from app.services.clients import gemini_client, gemini_semaphore, gemini_retry
 
 logger = logging.getLogger(__name__)
 
+# Built once at import; Pydantic regenerates the nested schema on every call otherwise
+_FEEDBACK_SCHEMA = FeedbackResponse.model_json_schema()
+
+# Structured-output generation config shared by interactive and batch analyses
+_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_json_schema": _FEEDBACK_SCHEMA,
+    "temperature": 0.4,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+}
+
+# Extension -> MIME type for the formats we expect; other extensions go through _mime_type's fallback
+_VIDEO_MIME = {
+    '.mp4': 'video/mp4',
+    '.m4v': 'video/mp4',
+    '.mov': 'video/quicktime',
+    '.webm': 'video/webm',
+    '.mkv': 'video/x-matroska',
+    '.avi': 'video/x-msvideo',
+    '.mpeg': 'video/mpeg',
+    '.mpg': 'video/mpeg',
+    '.3gp': 'video/3gpp',
+    '.wmv': 'video/x-ms-wmv',
+    '.flv': 'video/x-flv',
+}
+_AUDIO_MIME = {
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.m4a': 'audio/mp4',
+    '.aac': 'audio/aac',
+    '.ogg': 'audio/ogg',
+    '.opus': 'audio/ogg',
+    '.flac': 'audio/flac',
+}
+
+
+def _mime_type(path: str, table: Dict[str, str], default: str) -> str:
+    """Look up a file's MIME type by extension, consulting the system mimetypes database only for unlisted ones."""
+    mime_type = table.get(Path(path).suffix.lower())
+    if mime_type is None:
+        mime_type = mimetypes.guess_type(path)[0] or default
+    return mime_type
+
+# Exact-match response cache settings
+CACHE_TTL_SECONDS = 3600
+CACHE_MAX_ENTRIES = 128
+REDIS_KEY_PREFIX = "speech-analysis:"
+HASH_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Batch API job states after which polling stops
+_BATCH_DONE_STATES = {
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_PARTIALLY_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
+# Finished states whose inlined responses are worth parsing; failed items are analyzed individually
+_BATCH_RESULT_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"}
+
 class SpeechAnalyzer:
     """Analyzes speech videos using Gemini and the general_prompt.txt schema."""
     
     def __init__(self):
-        self.client = genai.Client(api_key=GOOGLE_AI_STUDIO_API_KEY)
+        self.client = gemini_client
         self.system_prompt = self._load_prompt()
+        # Maps cache key -> (stored_at, feedback dict), oldest first
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._redis = self._connect_redis()
+        # Analyses currently running, by cache key, so identical concurrent requests share one
+        self._inflight: Dict[str, asyncio.Task] = {}
+    
+    def _connect_redis(self):
+        """Create the shared Redis cache client, or return None if REDIS_URL is not set."""
+        if not REDIS_URL:
+            return None
+        import redis.asyncio as redis
+        logger.info("Using Redis for the shared analysis cache")
+        return redis.from_url(REDIS_URL)
     
     def _load_prompt(self) -> str:
         """Load the general analysis prompt."""
@@ -23,9 +103,9 @@ class SpeechAnalyzer:
             raise FileNotFoundError(f"Prompt file not found: {prompt_path}")
         return prompt_path.read_text(encoding="utf-8")
     
-    def _wait_for_file_active(self, file, timeout: int = 120) -> None:
+    async def _wait_for_file_active(self, file, timeout: int = 120) -> None:
         """
-        Wait for uploaded file to become ACTIVE.
+        Wait for uploaded file to become ACTIVE, polling with exponential backoff.
         
         Args:
             file: The uploaded file object
@@ -35,23 +115,220 @@ class SpeechAnalyzer:
             TimeoutError: If file doesn't become active within timeout
         """
         start_time = time.time()
+        delay = 0.5
         while time.time() - start_time < timeout:
-            file_status = self.client.files.get(name=file.name)
+            file_status = await self.client.aio.files.get(name=file.name)
             if file_status.state == "ACTIVE":
                 logger.info(f"File {file.name} is now ACTIVE")
                 return
             elif file_status.state == "FAILED":
                 raise RuntimeError(f"File {file.name} processing FAILED")
             
-            logger.info(f"File {file.name} state: {file_status.state}, waiting...")
-            time.sleep(2)
+            logger.info(f"File {file.name} state: {file_status.state}, retrying in {delay}s...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 4.0)
         
         raise TimeoutError(f"File {file.name} did not become ACTIVE within {timeout} seconds")
     
+    async def _upload_and_wait(self, path: str, mime_type: str):
+        """
+        Upload a file to Gemini and wait for it to become ACTIVE.
+        
+        Args:
+            path: Path to the file to upload
+            mime_type: MIME type of the file
+            
+        Returns:
+            The uploaded file object, ready to be referenced in a request
+        """
+        file = await self.client.aio.files.upload(file=path, config={'mime_type': mime_type})
+        logger.info(f"Uploaded {path}: {file.name}, state: {file.state}")
+        
+        try:
+            await self._wait_for_file_active(file)
+        except BaseException:
+            # The caller never receives this handle, so clean it up here
+            await self._delete_file(file)
+            raise
+        return file
+    
+    async def _delete_file(self, file) -> None:
+        """Delete an uploaded file from Gemini's storage, logging (not raising) on failure."""
+        try:
+            await self.client.aio.files.delete(name=file.name)
+            logger.info(f"Deleted file: {file.name}")
+        except Exception as cleanup_error:
+            logger.warning(f"Failed to cleanup file {file.name}: {cleanup_error}")
+    
+    async def _cancel_batch(self, job) -> None:
+        """Cancel an unfinished Gemini batch job, logging (not raising) on failure."""
+        try:
+            await self.client.aio.batches.cancel(name=job.name)
+            logger.info(f"Cancelled batch job {job.name}")
+        except Exception as cancel_error:
+            logger.warning(f"Failed to cancel batch job {job.name}: {cancel_error}")
+    
+    @staticmethod
+    def _hash_file(path: str) -> bytes:
+        """Return the SHA-256 digest of a file, streamed from disk."""
+        with open(path, 'rb') as f:
+            if hasattr(hashlib, 'file_digest'):
+                # Python 3.11+: hashing loop runs in C
+                return hashlib.file_digest(f, 'sha256').digest()
+            digest = hashlib.sha256()
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+            return digest.digest()
+    
+    async def _cache_key(self, video_path: str, audio_path: Optional[str] = None) -> str:
+        """Build the response cache key from file contents, prompt, and model."""
+        video_hash = await asyncio.to_thread(self._hash_file, video_path)
+        audio_hash = await asyncio.to_thread(self._hash_file, audio_path) if audio_path else b''
+        return hashlib.sha256(
+            video_hash + audio_hash + self.system_prompt.encode() + GEMINI_MODEL.encode()
+        ).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached feedback dict, or None if missing or expired."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, feedback = entry
+        if time.time() - stored_at > CACHE_TTL_SECONDS:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return feedback
+    
+    def _cache_set(self, key: str, feedback: Dict[str, Any]) -> None:
+        """Store a feedback dict, evicting the least recently used entries beyond the limit."""
+        self._cache[key] = (time.time(), feedback)
+        self._cache.move_to_end(key)
+        while len(self._cache) > CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+    
+    async def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Fetch a feedback dict from Redis, treating any Redis failure as a miss."""
+        if self._redis is None:
+            return None
+        try:
+            cached = await self._redis.get(REDIS_KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"Redis cache lookup failed: {e}")
+            return None
+        return orjson.loads(cached) if cached is not None else None
+    
+    async def _redis_set(self, key: str, feedback: Dict[str, Any]) -> None:
+        """Store a feedback dict in Redis with the cache TTL, logging (not raising) on failure."""
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(REDIS_KEY_PREFIX + key, orjson.dumps(feedback), ex=CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Redis cache store failed: {e}")
+    
     async def analyze_video(self, video_path: str, audio_path: str = None) -> Dict[str, Any]:
         """
         Analyze a video file and return structured feedback using Gemini's structured outputs.
         
+        Identical inputs (same video/audio content, prompt, and model) are served
+        from an in-memory cache, backed by Redis when REDIS_URL is set, without
+        re-uploading or re-invoking Gemini. Concurrent calls for the same inputs
+        share a single in-flight analysis.
+        
+        Args:
+            video_path: Path to the video file
+            audio_path: Optional path to separate audio file
+            
+        Returns:
+            Dictionary matching the FeedbackResponse Pydantic model schema
+        """
+        key = await self._cache_key(video_path, audio_path)
+        cached = self._cache_get(key)
+        if cached is not None:
+            logger.info(f"Cache hit for video: {video_path}")
+            return cached
+        
+        task = self._inflight.get(key)
+        if task is not None:
+            logger.info(f"Joining in-flight analysis for video: {video_path}")
+        else:
+            # The shared analysis runs in its own task, so no single caller owns it
+            task = asyncio.create_task(self._analyze_uncached(key, video_path, audio_path))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._analysis_done(key, done))
+        # Shield so a disconnecting caller (first or not) doesn't cancel the analysis for the others
+        return await asyncio.shield(task)
+    
+    def _analysis_done(self, key: str, task: asyncio.Task) -> None:
+        """Forget a finished shared analysis; its result is in the cache if it succeeded."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away; callers re-raise it themselves
+            task.exception()
+    
+    async def _analyze_uncached(self, key: str, video_path: str, audio_path: Optional[str]) -> Dict[str, Any]:
+        """Serve an in-process cache miss from Redis or Gemini, populating both cache layers."""
+        cached = await self._redis_get(key)
+        if cached is not None:
+            logger.info(f"Redis cache hit for video: {video_path}")
+            self._cache_set(key, cached)
+            return cached
+        
+        async with gemini_semaphore:
+            feedback = await self._generate_feedback(video_path, audio_path)
+        self._cache_set(key, feedback)
+        await self._redis_set(key, feedback)
+        return feedback
+    
+    async def _upload_inputs(self, video_path: str, audio_path: Optional[str] = None):
+        """
+        Upload a video (and separate audio, if provided) concurrently, waiting for each to be processed.
+        
+        If any upload fails, the ones that succeeded are deleted before the error is raised.
+        
+        Returns:
+            Tuple of (video_file, audio_file), where audio_file is None without audio_path
+        """
+        video_mime_type = _mime_type(video_path, _VIDEO_MIME, 'video/mp4')
+        uploads = [self._upload_and_wait(video_path, video_mime_type)]
+        if audio_path:
+            audio_mime_type = _mime_type(audio_path, _AUDIO_MIME, 'audio/mpeg')
+            uploads.append(self._upload_and_wait(audio_path, audio_mime_type))
+        
+        results = await asyncio.gather(*uploads, return_exceptions=True)
+        
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            await asyncio.gather(*(
+                self._delete_file(result) for result in results if not isinstance(result, BaseException)
+            ))
+            raise errors[0]
+        return results[0], (results[1] if audio_path else None)
+    
+    def _build_contents(self, video_file, audio_file=None) -> List[Dict[str, Any]]:
+        """Build the generate_content request contents: prompt, video, and optional audio."""
+        return [
+            {
+                "role": "user",
+                "parts": [
+                    {"text": self.system_prompt},
+                    {"file_data": {"file_uri": video_file.uri}},
+                    *([{"file_data": {"file_uri": audio_file.uri}}] if audio_file else [])
+                ]
+            }
+        ]
+    
+    @gemini_retry
+    async def _generate_content(self, **kwargs):
+        """Call Gemini generate_content, retrying when rate limited."""
+        return await self.client.aio.models.generate_content(**kwargs)
+    
+    async def _generate_feedback(self, video_path: str, audio_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Upload the files to Gemini and generate structured feedback.
+        
         Args:
             video_path: Path to the video file
             audio_path: Optional path to separate audio file
@@ -65,51 +342,14 @@ class SpeechAnalyzer:
         try:
             logger.info(f"Starting analysis for video: {video_path}")
             
-            # Determine mime type for video
-            import mimetypes
-            video_mime_type = mimetypes.guess_type(video_path)[0] or 'video/mp4'
-            
-            # Upload video file - open and read the file
-            with open(video_path, 'rb') as f:
-                video_file = self.client.files.upload(file=f, config={'mime_type': video_mime_type})
-            logger.info(f"Uploaded video: {video_file.name}, state: {video_file.state}")
-            
-            # Wait for file to be processed
-            self._wait_for_file_active(video_file)
-            
-            # Prepare content parts - include the prompt and video
-            content_parts = [self.system_prompt]
-            
-            # If separate audio provided, upload and include it
-            if audio_path:
-                audio_mime_type = mimetypes.guess_type(audio_path)[0] or 'audio/mpeg'
-                with open(audio_path, 'rb') as f:
-                    audio_file = self.client.files.upload(file=f, config={'mime_type': audio_mime_type})
-                logger.info(f"Uploaded audio: {audio_file.name}, state: {audio_file.state}")
-                self._wait_for_file_active(audio_file)
+            video_file, audio_file = await self._upload_inputs(video_path, audio_path)
             
             # Generate analysis with structured output
             logger.info("Generating analysis with Gemini using structured outputs...")
-            response = self.client.models.generate_content(
+            response = await self._generate_content(
                 model=GEMINI_MODEL,
-                contents=[
-                    {
-                        "role": "user",
-                        "parts": [
-                            {"text": self.system_prompt},
-                            {"file_data": {"file_uri": video_file.uri}},
-                            *([{"file_data": {"file_uri": audio_file.uri}}] if audio_file else [])
-                        ]
-                    }
-                ],
-                config={
-                    "response_mime_type": "application/json",
-                    "response_json_schema": FeedbackResponse.model_json_schema(),
-                    "temperature": 0.4,
-                    "top_p": 0.95,
-                    "top_k": 40,
-                    "max_output_tokens": 8192,
-                }
+                contents=self._build_contents(video_file, audio_file),
+                config=_GENERATION_CONFIG
             )
             
             # Validate and parse the response using Pydantic
@@ -126,13 +366,140 @@ class SpeechAnalyzer:
             logger.error(f"Analysis failed: {e}")
             raise
         finally:
-            # Clean up uploaded files from Gemini's storage
+            # Clean up uploaded files from Gemini's storage, concurrently
+            await asyncio.gather(
+                *(self._delete_file(file) for file in (video_file, audio_file) if file),
+                return_exceptions=True
+            )
+    
+    async def analyze_videos_batch(
+        self,
+        inputs: List[Tuple[str, Optional[str]]],
+        timeout: int = 24 * 3600
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze many videos through Gemini's Batch API, trading latency for throughput and cost.
+        
+        Intended for non-interactive workloads (e.g. re-evaluating past uploads). Cached
+        results (in-process or Redis) are reused; the remaining videos are submitted as a
+        single batch job.
+        Videos the batch could not analyze, or all of them if the Batch API is unavailable,
+        fall back to analyze_video.
+        
+        Args:
+            inputs: List of (video_path, audio_path) pairs; audio_path may be None
+            timeout: Maximum seconds to wait for the batch job (default 24 hours)
+            
+        Returns:
+            List of feedback dictionaries, in the same order as inputs
+        """
+        keys = await asyncio.gather(*(self._cache_key(video_path, audio_path) for video_path, audio_path in inputs))
+        results: List[Optional[Dict[str, Any]]] = [self._cache_get(key) for key in keys]
+        
+        # In-process misses may still be in the shared Redis tier
+        misses = [i for i, result in enumerate(results) if result is None]
+        for i, cached in zip(misses, await asyncio.gather(*(self._redis_get(keys[i]) for i in misses))):
+            if cached is not None:
+                results[i] = cached
+                self._cache_set(keys[i], cached)
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        logger.info(f"Batch analysis: {len(inputs) - len(pending)} cached, {len(pending)} to analyze")
+        
+        if pending:
             try:
-                if video_file:
-                    self.client.files.delete(name=video_file.name)
-                    logger.info(f"Deleted video file: {video_file.name}")
-                if audio_file:
-                    self.client.files.delete(name=audio_file.name)
-                    logger.info(f"Deleted audio file: {audio_file.name}")
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup files: {cleanup_error}")
+                batch_results = await self._run_batch([inputs[i] for i in pending], timeout)
+            except Exception as e:
+                logger.warning(f"Batch analysis unavailable, analyzing individually: {e}")
+                batch_results = [None] * len(pending)
+            
+            for i, feedback in zip(pending, batch_results):
+                if feedback is not None:
+                    results[i] = feedback
+                    self._cache_set(keys[i], feedback)
+                    await self._redis_set(keys[i], feedback)
+            
+            # Fall back to the interactive path for anything the batch didn't produce
+            fallback = [i for i in pending if results[i] is None]
+            if fallback:
+                fallback_results = await asyncio.gather(*(self.analyze_video(*inputs[i]) for i in fallback))
+                for i, feedback in zip(fallback, fallback_results):
+                    results[i] = feedback
+        
+        return results
+    
+    async def _run_batch(
+        self,
+        inputs: List[Tuple[str, Optional[str]]],
+        timeout: int
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Upload all inputs, run them as one Gemini batch job, and parse the responses.
+        
+        Returns:
+            Feedback dictionaries in input order, with None for inputs that failed to
+            upload or whose batch response was missing or invalid
+        """
+        async def upload(video_path: str, audio_path: Optional[str]):
+            async with gemini_semaphore:
+                return await self._upload_inputs(video_path, audio_path)
+        
+        uploads = await asyncio.gather(*(upload(v, a) for v, a in inputs), return_exceptions=True)
+        uploaded = [(i, files) for i, files in enumerate(uploads) if not isinstance(files, BaseException)]
+        for (video_path, _), files in zip(inputs, uploads):
+            if isinstance(files, BaseException):
+                logger.warning(f"Upload failed for {video_path}, will analyze individually: {files}")
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(inputs)
+        if not uploaded:
+            return results
+        
+        job = None
+        try:
+            job = await self.client.aio.batches.create(
+                model=GEMINI_MODEL,
+                src=[
+                    {"contents": self._build_contents(video_file, audio_file), "config": _GENERATION_CONFIG}
+                    for _, (video_file, audio_file) in uploaded
+                ],
+                config={"display_name": "speech-analysis-batch"}
+            )
+            logger.info(f"Submitted batch job {job.name} with {len(uploaded)} requests")
+            
+            # Batch jobs take minutes to hours, so poll with a slowly growing interval
+            start_time = time.time()
+            delay = 5.0
+            while job.state not in _BATCH_DONE_STATES:
+                if time.time() - start_time > timeout:
+                    raise TimeoutError(f"Batch job {job.name} did not finish within {timeout} seconds")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+                job = await self.client.aio.batches.get(name=job.name)
+                logger.info(f"Batch job {job.name} state: {job.state}")
+            
+            if job.state not in _BATCH_RESULT_STATES:
+                raise RuntimeError(f"Batch job {job.name} ended in state {job.state}")
+            
+            responses = job.dest.inlined_responses if job.dest else None
+            for (i, _), item in zip(uploaded, responses or []):
+                if item.error or not item.response:
+                    logger.warning(f"Batch request for {inputs[i][0]} failed: {item.error}")
+                    continue
+                try:
+                    results[i] = FeedbackResponse.model_validate_json(item.response.text).model_dump()
+                except Exception as e:
+                    logger.warning(f"Invalid batch response for {inputs[i][0]}: {e}")
+            return results
+        finally:
+            # On timeout or cancellation, stop the remote job before deleting the files it reads
+            if job is not None and job.state not in _BATCH_DONE_STATES:
+                await self._cancel_batch(job)
+            await asyncio.gather(
+                *(
+                    self._delete_file(file)
+                    for _, files in uploaded
+                    for file in files
+                    if file
+                ),
+                return_exceptions=True
+            )
@@ -1,12 +1,20 @@
-from google import genai
 import uuid
 import logging
+import orjson
+import time
+from collections import OrderedDict
 from typing import Dict, Any
 
-from app.config import GOOGLE_AI_STUDIO_API_KEY, GEMINI_MODEL
+from app.config import GEMINI_MODEL
+from app.services.clients import gemini_client, gemini_semaphore, gemini_retry
 
 logger = logging.getLogger(__name__)
 
+# Conversation store limits: least recently used conversations are evicted beyond
+# MAX_CONVERSATIONS, and idle ones expire after CONVERSATION_TTL_SECONDS
+MAX_CONVERSATIONS = 1000
+CONVERSATION_TTL_SECONDS = 3600
+
 CHAT_SYSTEM_INSTRUCTION = """You are a helpful, precise assistant that answers questions about a user's speaking performance using ONLY the provided feedback_json. The feedback_json follows the schema with non_verbal (eye_contact, gestures, posture); delivery (clarity_enunciation, intonation, eloquence_filler_words + filler_word_counts); content (organization_flow, persuasiveness_impact, clarity_of_message); overall_feedback.
 
 Primary goals:
@@ -38,9 +46,23 @@ class FeedbackChat:
     """Interactive chat for discussing speech feedback."""
     
     def __init__(self):
-        self.client = genai.Client(api_key=GOOGLE_AI_STUDIO_API_KEY)
-        # In-memory store for dev; use Redis/DB in production
-        self.conversations: Dict[str, Dict[str, Any]] = {}
+        self.client = gemini_client
+        # In-memory LRU + TTL store for dev; use Redis/DB in production
+        self.conversations: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
+    def _prune_conversations(self) -> None:
+        """Drop expired conversations, then evict the least recently used beyond the limit."""
+        cutoff = time.time() - CONVERSATION_TTL_SECONDS
+        # Entries are ordered by last use, so expired ones are all at the front
+        while self.conversations:
+            conversation_id, conv = next(iter(self.conversations.items()))
+            if conv["last_used"] >= cutoff:
+                break
+            del self.conversations[conversation_id]
+            logger.info(f"Expired conversation {conversation_id}")
+        while len(self.conversations) > MAX_CONVERSATIONS:
+            conversation_id, _ = self.conversations.popitem(last=False)
+            logger.info(f"Evicted conversation {conversation_id}")
     
     def start_conversation(self, feedback_json: Dict[str, Any]) -> str:
         """
@@ -54,15 +76,36 @@ class FeedbackChat:
         """
         conversation_id = str(uuid.uuid4())
         
-        # Store conversation with empty history
+        # Serialize the feedback once and pin it in the system instruction, so each
+        # turn only sends the new user message on top of the chat's own history
+        feedback_str = orjson.dumps(feedback_json).decode()
+        chat = self.client.aio.chats.create(
+            model=GEMINI_MODEL,
+            config={
+                "system_instruction": f"{CHAT_SYSTEM_INSTRUCTION}\n\nfeedback_json = {feedback_str}",
+                "temperature": 0.7,
+                "top_p": 0.95,
+                "top_k": 40,
+                "max_output_tokens": 2048,
+            }
+        )
+        
         self.conversations[conversation_id] = {
-            "history": [],
-            "feedback_json": feedback_json
+            "chat": chat,
+            "feedback_json": feedback_json,
+            "last_used": time.time()
         }
+        self._prune_conversations()
         
         logger.info(f"Started conversation {conversation_id}")
         return conversation_id
     
+    @staticmethod
+    @gemini_retry
+    async def _send_chat_message(chat, user_message: str):
+        """Send a message on a Gemini chat session, retrying when rate limited."""
+        return await chat.send_message(user_message)
+    
     async def send_message(self, conversation_id: str, user_message: str) -> str:
         """
         Send a message in an existing conversation.
@@ -74,68 +117,19 @@ class FeedbackChat:
         Returns:
             The assistant's reply
         """
+        self._prune_conversations()
         if conversation_id not in self.conversations:
             raise ValueError(f"Conversation {conversation_id} not found")
         
         conv = self.conversations[conversation_id]
-        history = conv["history"]
-        feedback_json = conv["feedback_json"]
-        
-        # Construct prompt with feedback context
-        user_prompt = f"""feedback_json = {feedback_json}
-
-user_message = {user_message}
-
-Answer the user's question using only the feedback_json above."""
+        conv["last_used"] = time.time()
+        self.conversations.move_to_end(conversation_id)
+        chat = conv["chat"]
         
         try:
-            # Build contents with system instruction and conversation history
-            contents = []
-            
-            # Add system instruction as first user message if history is empty
-            if not history:
-                contents.append({
-                    "role": "user",
-                    "parts": [{"text": CHAT_SYSTEM_INSTRUCTION}]
-                })
-                contents.append({
-                    "role": "model",
-                    "parts": [{"text": "Understood. I will answer questions strictly based on the feedback_json provided."}]
-                })
-            
-            # Add conversation history
-            contents.extend(history)
-            
-            # Add current user message
-            contents.append({
-                "role": "user",
-                "parts": [{"text": user_prompt}]
-            })
-            
-            response = self.client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=contents,
-                config={
-                    "temperature": 0.7,
-                    "top_p": 0.95,
-                    "top_k": 40,
-                    "max_output_tokens": 2048,
-                }
-            )
-            
-            assistant_reply = response.text
-            
-            # Update conversation history
-            history.append({
-                "role": "user",
-                "parts": [{"text": user_prompt}]
-            })
-            history.append({
-                "role": "model",
-                "parts": [{"text": assistant_reply}]
-            })
-            
-            return assistant_reply
+            async with gemini_semaphore:
+                response = await self._send_chat_message(chat, user_message)
+            return response.text
         except Exception as e:
             logger.error(f"Chat error: {e}")
             raise
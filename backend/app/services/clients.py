@@ -0,0 +1,28 @@
+"""Shared API clients, created once so every service reuses the same connection pools."""
+import asyncio
+
+from elevenlabs import ElevenLabs
+from google import genai
+from google.genai import errors as genai_errors
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+from app.config import GOOGLE_AI_STUDIO_API_KEY, ELEVENLABS_API_KEY, MAX_CONCURRENT_GEMINI
+
+gemini_client = genai.Client(api_key=GOOGLE_AI_STUDIO_API_KEY)
+elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+
+# Bounds concurrent Gemini work across all services so bursts don't trip rate limits
+gemini_semaphore = asyncio.Semaphore(MAX_CONCURRENT_GEMINI)
+
+
+def _is_rate_limited(exc: BaseException) -> bool:
+    return isinstance(exc, genai_errors.APIError) and exc.code == 429
+
+
+# Retry Gemini calls that were throttled (HTTP 429) with jittered exponential backoff
+gemini_retry = retry(
+    retry=retry_if_exception(_is_rate_limited),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
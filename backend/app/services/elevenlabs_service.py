@@ -1,25 +1,65 @@
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List
 from pathlib import Path
-from elevenlabs import ElevenLabs, VoiceSettings
-from google import genai
+from elevenlabs import VoiceSettings
 
-from app.config import (
-    ELEVENLABS_API_KEY, 
-    ELEVENLABS_VOICE_SETTINGS,
-    GOOGLE_AI_STUDIO_API_KEY,
-    GEMINI_MODEL
-)
+from app.config import ELEVENLABS_VOICE_SETTINGS, GEMINI_MODEL
+from app.models import SpeechImprovement
+from app.services.clients import elevenlabs_client, gemini_client
 
 logger = logging.getLogger(__name__)
 
+# Built once at import and passed as the structured-output schema for every improvement request
+_SPEECH_IMPROVEMENT_SCHEMA = SpeechImprovement.model_json_schema()
+
+
+class ClonedVoiceStream:
+    """
+    Iterator over audio generated with a cloned voice that owns the voice.
+    
+    The voice is deleted when the stream is exhausted, fails, or is closed. close() is safe to
+    call more than once and also works if iteration never started, e.g. when the client
+    disconnects before the response body is sent.
+    """
+    
+    def __init__(self, client, voice_id: str, chunks: Iterator[bytes]):
+        self.client = client
+        self.voice_id = voice_id
+        self._chunks = chunks
+        self._closed = False
+    
+    def __iter__(self) -> "ClonedVoiceStream":
+        return self
+    
+    def __next__(self) -> bytes:
+        if self._closed:
+            raise StopIteration
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+    
+    def close(self) -> None:
+        """Stop generating and delete the cloned voice."""
+        if self._closed:
+            return
+        self._closed = True
+        self._chunks.close()
+        try:
+            self.client.voices.ivc.delete(self.voice_id)
+            logger.info(f"Cleaned up cloned voice: {self.voice_id}")
+        except Exception as e:
+            logger.warning(f"Failed to cleanup cloned voice: {e}")
+
 
 class ElevenLabsService:
     """Service for ElevenLabs API operations: transcription, voice cloning, and TTS."""
     
     def __init__(self):
-        self.client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
-        self.gemini_client = genai.Client(api_key=GOOGLE_AI_STUDIO_API_KEY)
+        self.client = elevenlabs_client
+        self.gemini_client = gemini_client
         
     async def extract_audio_from_video(self, video_path: str) -> str:
         """
@@ -99,21 +139,25 @@ class ElevenLabsService:
                 else:
                     language_code = stripped
             
-            with open(audio_path, 'rb') as audio_file:
-                # Build parameters dict, excluding language_code if None
-                params = {
-                    "file": audio_file,
-                    "model_id": "scribe_v1",
-                    "diarize": diarize,
-                    "tag_audio_events": tag_audio_events,
-                }
-                
-                # Only include language_code if it's not None
-                if language_code is not None:
-                    params["language_code"] = language_code
-                
-                # Use ElevenLabs speech-to-text with correct parameters
-                transcription = self.client.speech_to_text.convert(**params)
+            def convert():
+                with open(audio_path, 'rb') as audio_file:
+                    # Build parameters dict, excluding language_code if None
+                    params = {
+                        "file": audio_file,
+                        "model_id": "scribe_v1",
+                        "diarize": diarize,
+                        "tag_audio_events": tag_audio_events,
+                    }
+                    
+                    # Only include language_code if it's not None
+                    if language_code is not None:
+                        params["language_code"] = language_code
+                    
+                    # Use ElevenLabs speech-to-text with correct parameters
+                    return self.client.speech_to_text.convert(**params)
+            
+            # The SDK call blocks, so run it off the event loop (lets batch transcriptions overlap)
+            transcription = await asyncio.to_thread(convert)
                 
             logger.info(f"Transcription completed: {len(transcription.text)} characters")
             return transcription.text
@@ -122,6 +166,35 @@ class ElevenLabsService:
             logger.error(f"Transcription failed: {e}")
             raise RuntimeError(f"Transcription failed: {str(e)}")
     
+    async def transcribe_audio_batch(
+        self,
+        audio_path: str,
+        language_codes: List[Optional[str]],
+        diarize: bool = False,
+        tag_audio_events: bool = False
+    ) -> List[str]:
+        """
+        Transcribe one audio file under several language hints concurrently.
+        
+        Args:
+            audio_path: Path to the audio file
+            language_codes: Language codes to try; None entries auto-detect
+            diarize: Whether to annotate who is speaking
+            tag_audio_events: Tag audio events like laughter, applause, etc.
+            
+        Returns:
+            Transcribed text for each language code, in the same order
+        """
+        return list(await asyncio.gather(*(
+            self.transcribe_audio(
+                audio_path,
+                language_code=code,
+                diarize=diarize,
+                tag_audio_events=tag_audio_events
+            )
+            for code in language_codes
+        )))
+    
     async def improve_speech_content(
         self, 
         transcription: str,
@@ -138,8 +211,6 @@ class ElevenLabsService:
             Dictionary with improved text and suggestions
         """
         try:
-            from app.models import SpeechImprovement
-            
             logger.info("Improving speech content with Gemini using structured outputs")
             
             # Build the improvement prompt
@@ -162,7 +233,7 @@ Please provide:
                 contents=prompt,
                 config={
                     "response_mime_type": "application/json",
-                    "response_json_schema": SpeechImprovement.model_json_schema(),
+                    "response_json_schema": _SPEECH_IMPROVEMENT_SCHEMA,
                     "temperature": 0.4,
                     "top_p": 0.95,
                     "top_k": 40,
@@ -180,14 +251,18 @@ Please provide:
             logger.error(f"Speech improvement failed: {e}")
             raise RuntimeError(f"Speech improvement failed: {str(e)}")
     
-    async def clone_voice_and_generate(
+    async def clone_voice_and_stream(
         self,
         audio_path: str,
         text: str,
         voice_name: str = "User Cloned Voice"
-    ) -> bytes:
+    ) -> ClonedVoiceStream:
         """
-        Clone a voice from an audio file and generate speech with the cloned voice.
+        Clone a voice from an audio file and stream speech generated with the cloned voice.
+        
+        The voice is cloned before this returns, so audio_path may be deleted as soon as
+        it does. The cloned voice is deleted once the returned stream is exhausted or closed;
+        callers that may never iterate it must call close().
         
         Args:
             audio_path: Path to the audio file to clone voice from
@@ -195,7 +270,7 @@ Please provide:
             voice_name: Name for the cloned voice
             
         Returns:
-            Audio bytes of the generated speech
+            Iterator over chunks of the generated audio (MP3)
         """
         try:
             logger.info(f"Cloning voice from: {audio_path}")
@@ -211,10 +286,19 @@ Please provide:
             
             logger.info(f"Voice cloned successfully with ID: {voice.voice_id}")
             
-            # Generate speech with the cloned voice
+        except Exception as e:
+            logger.error(f"Voice cloning failed: {e}")
+            raise RuntimeError(f"Voice cloning failed: {str(e)}")
+        
+        return ClonedVoiceStream(self.client, voice.voice_id, self._stream_speech(voice.voice_id, text))
+    
+    def _stream_speech(self, voice_id: str, text: str) -> Iterator[bytes]:
+        """Yield TTS audio chunks for a cloned voice; ClonedVoiceStream deletes the voice afterwards."""
+        total_bytes = 0
+        try:
             logger.info("Generating speech with cloned voice")
             audio_generator = self.client.text_to_speech.convert(
-                voice_id=voice.voice_id,
+                voice_id=voice_id,
                 text=text,
                 model_id="eleven_multilingual_v2",
                 voice_settings=VoiceSettings(
@@ -224,23 +308,84 @@ Please provide:
                     use_speaker_boost=ELEVENLABS_VOICE_SETTINGS["use_speaker_boost"]
                 )
             )
+            for chunk in audio_generator:
+                total_bytes += len(chunk)
+                yield chunk
+            logger.info(f"Generated audio: {total_bytes} bytes")
+        except Exception as e:
+            logger.error(f"Speech generation failed: {e}")
+            raise RuntimeError(f"Speech generation failed: {str(e)}")
+    
+    async def clone_voice_and_generate(
+        self,
+        audio_path: str,
+        text: str,
+        voice_name: str = "User Cloned Voice"
+    ) -> bytes:
+        """
+        Clone a voice from an audio file and generate speech with the cloned voice.
+        
+        Prefer clone_voice_and_stream when the audio can be sent as it is generated.
+        
+        Args:
+            audio_path: Path to the audio file to clone voice from
+            text: Text to generate speech for
+            voice_name: Name for the cloned voice
+            
+        Returns:
+            Audio bytes of the generated speech
+        """
+        audio_stream = await self.clone_voice_and_stream(audio_path, text, voice_name)
+        return b"".join(audio_stream)
+    
+    async def streaming_speech_improvement_workflow(
+        self,
+        audio_path: str,
+        improvement_focus: Optional[str] = None,
+        language_code: Optional[str] = None,
+        diarize: bool = False,
+        tag_audio_events: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Complete workflow like full_speech_improvement_workflow, but streams the generated audio.
+        
+        Args:
+            audio_path: Path to the original audio file
+            improvement_focus: Optional specific areas to focus on
+            language_code: Language code (e.g., 'eng', 'spa'). None for auto-detect
+            diarize: Whether to annotate who is speaking
+            tag_audio_events: Tag audio events like laughter, applause, etc.
+            
+        Returns:
+            Dictionary with transcription, improvements, and an iterator over the audio chunks
+        """
+        try:
+            transcription = await self.transcribe_audio(
+                audio_path,
+                language_code=language_code,
+                diarize=diarize,
+                tag_audio_events=tag_audio_events
+            )
             
-            # Collect audio bytes
-            generated_audio_bytes = b"".join(audio_generator)
-            logger.info(f"Generated audio: {len(generated_audio_bytes)} bytes")
+            improvements = await self.improve_speech_content(
+                transcription,
+                improvement_focus
+            )
             
-            # Clean up: delete the cloned voice
-            try:
-                self.client.voices.ivc.delete(voice.voice_id)
-                logger.info(f"Cleaned up cloned voice: {voice.voice_id}")
-            except Exception as e:
-                logger.warning(f"Failed to cleanup cloned voice: {e}")
+            audio_stream = await self.clone_voice_and_stream(
+                audio_path,
+                improvements["improved_speech"]
+            )
             
-            return generated_audio_bytes
+            return {
+                "original_transcription": transcription,
+                "improved_content": improvements,
+                "improved_audio_stream": audio_stream
+            }
             
         except Exception as e:
-            logger.error(f"Voice cloning failed: {e}")
-            raise RuntimeError(f"Voice cloning failed: {str(e)}")
+            logger.error(f"Streaming workflow failed: {e}")
+            raise RuntimeError(f"Streaming workflow failed: {str(e)}")
     
     async def full_speech_improvement_workflow(
         self,
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiofiles
+
+from app.config import UPLOADS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Unfinished or unclaimed uploads are discarded after this long without activity
+UPLOAD_TTL_SECONDS = 3600
+MAX_PARTS = 10000
+
+
+class UploadStore:
+    """Multipart uploads: a large file is sent as numbered parts (in parallel), then assembled on disk."""
+
+    def __init__(self):
+        # In-memory upload registry for dev; parts themselves live under UPLOADS_DIR
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+
+    def _parts_dir(self, upload_id: str) -> Path:
+        return UPLOADS_DIR / f"upload_{upload_id}_parts"
+
+    def _discard(self, upload_id: str) -> None:
+        upload = self.uploads.pop(upload_id, None)
+        shutil.rmtree(self._parts_dir(upload_id), ignore_errors=True)
+        if upload and upload["path"] and upload["path"].exists():
+            upload["path"].unlink()
+
+    def _prune_uploads(self) -> None:
+        """Discard uploads that were abandoned or never claimed."""
+        cutoff = time.time() - UPLOAD_TTL_SECONDS
+        expired = [
+            uid for uid, upload in self.uploads.items()
+            # Never pull files out from under a part write or an assembly in progress
+            if upload["last_activity"] < cutoff and not upload["writes"] and upload["state"] != "assembling"
+        ]
+        for upload_id in expired:
+            logger.info(f"Expired upload {upload_id}")
+            self._discard(upload_id)
+
+    def _get(self, upload_id: str) -> Dict[str, Any]:
+        upload = self.uploads.get(upload_id)
+        if upload is None:
+            raise KeyError(upload_id)
+        return upload
+
+    def create(self, filename: str) -> str:
+        """Start a multipart upload for a file and return its upload_id."""
+        self._prune_uploads()
+        upload_id = uuid.uuid4().hex
+        self._parts_dir(upload_id).mkdir()
+        now = time.time()
+        self.uploads[upload_id] = {
+            "filename": Path(filename).name or "upload",
+            "created": now,
+            "last_activity": now,
+            # open -> assembling -> complete
+            "state": "open",
+            "writes": 0,
+            "path": None,
+        }
+        return upload_id
+
+    async def write_part(self, upload_id: str, part_number: int, chunks: AsyncIterator[bytes]) -> int:
+        """
+        Store one part of an upload, replacing any earlier attempt at the same part.
+
+        Returns:
+            Size of the stored part in bytes
+        """
+        upload = self._get(upload_id)
+        if upload["state"] != "open":
+            raise ValueError(f"Upload is already {upload['state']}")
+        if not 0 <= part_number < MAX_PARTS:
+            raise ValueError(f"Part number must be between 0 and {MAX_PARTS - 1}")
+
+        part_path = self._parts_dir(upload_id) / f"{part_number:05d}.part"
+        size = 0
+        upload["writes"] += 1
+        upload["last_activity"] = time.time()
+        try:
+            async with aiofiles.open(part_path, "wb") as buffer:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    await buffer.write(chunk)
+        finally:
+            upload["writes"] -= 1
+            upload["last_activity"] = time.time()
+        return size
+
+    async def complete(self, upload_id: str, part_count: Optional[int] = None) -> int:
+        """
+        Assemble the uploaded parts, in order, into one file.
+
+        Args:
+            upload_id: Upload to complete
+            part_count: Number of parts the client sent; checked when given
+
+        Returns:
+            Size of the assembled file in bytes
+        """
+        upload = self._get(upload_id)
+        if upload["state"] != "open":
+            raise ValueError(f"Upload is already {upload['state']}")
+        if upload["writes"]:
+            raise ValueError("Parts are still being written")
+
+        parts = sorted(self._parts_dir(upload_id).glob("*.part"))
+        numbers = [int(part.stem) for part in parts]
+        if not parts or numbers != list(range(len(parts))):
+            raise ValueError("Parts must be numbered contiguously from 0")
+        if part_count is not None and part_count != len(parts):
+            raise ValueError(f"Expected {part_count} parts, received {len(parts)}")
+
+        path = UPLOADS_DIR / f"upload_{upload_id}_{upload['filename']}"
+
+        def assemble() -> int:
+            with path.open("wb") as out:
+                for part in parts:
+                    with part.open("rb") as f:
+                        shutil.copyfileobj(f, out)
+            shutil.rmtree(self._parts_dir(upload_id), ignore_errors=True)
+            return path.stat().st_size
+
+        # Claimed before the first await, so parts can't change and a second complete gets a 409
+        upload["state"] = "assembling"
+        upload["last_activity"] = time.time()
+        try:
+            size = await asyncio.to_thread(assemble)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            upload["state"] = "open"
+            raise
+        upload["state"] = "complete"
+        upload["path"] = path
+        upload["last_activity"] = time.time()
+        logger.info(f"Assembled upload {upload_id} from {len(parts)} parts ({size} bytes)")
+        return size
+
+    def take(self, upload_id: str) -> Path:
+        """Claim a completed upload's file; the caller becomes responsible for deleting it."""
+        upload = self._get(upload_id)
+        if upload["state"] != "complete":
+            raise ValueError("Upload is not complete")
+        del self.uploads[upload_id]
+        return upload["path"]
+
+    def abort(self, upload_id: str) -> None:
+        """Discard an upload and any parts received so far."""
+        if self._get(upload_id)["state"] == "assembling":
+            raise ValueError("Upload is being assembled")
+        self._discard(upload_id)
+
+
+# Shared by the uploads router and the analysis job endpoint
+upload_store = UploadStore()
@@ -5,7 +5,7 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from app.routers import analyze, chat, speech_improvement
+from app.routers import analyze, chat, speech_improvement, uploads
 
 # Configure logging
 logging.basicConfig(
@@ -32,19 +32,25 @@ app.add_middleware(
 app.include_router(analyze.router)
 app.include_router(chat.router)
 app.include_router(speech_improvement.router)
+app.include_router(uploads.router)
 
 @app.get("/")
 async def root():
     return {
         "message": "Speech Coach API v2.0",
         "endpoints": {
-            "analyze": "/analyze/video - Upload video for comprehensive feedback",
+            "analyze": {
+                "video": "/analyze/video - Upload video for comprehensive feedback",
+                "jobs": "/analyze/jobs - Submit video (or a completed upload_id) for background analysis, then poll /analyze/jobs/{job_id}"
+            },
+            "uploads": "/uploads - Multipart upload for large videos: create, PUT parts in parallel, complete",
             "chat": {
                 "start": "/chat/start - Start Q&A session with feedback JSON",
                 "message": "/chat/message - Ask questions about your feedback"
             },
             "speech_improvement": {
                 "transcribe": "/speech/transcribe - Transcribe audio to text",
+                "transcribe_batch": "/speech/transcribe/batch - Transcribe one upload under several language codes",
                 "improve": "/speech/improve - Transcribe and improve speech content",
                 "clone_and_improve": "/speech/clone-and-improve - Full workflow: transcribe, improve, clone voice, generate audio",
                 "clone_and_improve_detailed": "/speech/clone-and-improve-detailed - Same as above with detailed JSON response",
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Run the transcribe, analyze, and voice cloning tests concurrently against a running server.
+
+Each test spends nearly all its time waiting on the server, so running them as
+coroutines on one shared httpx.AsyncClient makes total wall time roughly that of
+the slowest test.
+"""
+
+import asyncio
+import sys
+
+import httpx
+
+import _test_utils
+import test_analyze_endpoint as analyze_tests
+import test_transcribe as transcribe_tests
+import test_voice_clone as voice_clone_tests
+
+
+async def run_all(client: httpx.AsyncClient, audio_file: str, video_file: str) -> bool:
+    """Run all tests concurrently, reporting each as it finishes. Returns True if all passed."""
+    tests = {
+        "transcribe": transcribe_tests.test_transcribe(client, audio_file),
+        "analyze": analyze_tests.test_analyze_with_video_only(client, video_file),
+        "voice cloning": voice_clone_tests.test_voice_cloning(client, audio_file),
+    }
+
+    async def run(name, coro):
+        passed = False
+        try:
+            passed = bool(await coro)
+            return passed
+        finally:
+            print(f"\n{'✅' if passed else '❌'} {name} finished")
+
+    outcomes = await asyncio.gather(
+        *(run(name, coro) for name, coro in tests.items()),
+        return_exceptions=True,
+    )
+
+    results = {}
+    for name, outcome in zip(tests, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"❌ {name} raised: {outcome}")
+            results[name] = False
+        else:
+            results[name] = bool(outcome)
+
+    print("\n" + "="*60)
+    for name in tests:
+        print(f"  {'✅' if results[name] else '❌'} {name}")
+    print("="*60)
+    return all(results.values())
+
+
+async def main():
+    _test_utils.parse_flags()
+
+    if len(sys.argv) < 2:
+        print(f"Usage: python run_all_tests.py <audio_file> [video_file] {_test_utils.FLAGS_USAGE}")
+        print("\nExample:")
+        print("  python run_all_tests.py speech.mp3 test_video.mp4")
+        sys.exit(1)
+
+    audio_file = sys.argv[1]
+    video_file = sys.argv[2] if len(sys.argv) > 2 else "test_video.mp4"
+
+    async with _test_utils.make_client() as client:
+        await _test_utils.ensure_server(client)
+        passed = await run_all(client, audio_file, video_file)
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    _test_utils.run(main())
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# app.config refuses to import without API keys; no real API calls are made in these tests
+os.environ.setdefault("GOOGLE_AI_STUDIO_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,122 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import analyze
+
+SUBCATEGORY = {
+    "effectiveness_score": 50,
+    "overall_feedback": "",
+    "observations": [],
+    "timestamped_feedback": [],
+}
+
+FEEDBACK = {
+    "non_verbal": {"eye_contact": SUBCATEGORY, "gestures": SUBCATEGORY, "posture": SUBCATEGORY},
+    "delivery": {
+        "clarity_enunciation": SUBCATEGORY,
+        "intonation": SUBCATEGORY,
+        "eloquence_filler_words": {**SUBCATEGORY, "filler_word_counts": {}},
+    },
+    "content": {
+        "organization_flow": SUBCATEGORY,
+        "persuasiveness_impact": SUBCATEGORY,
+        "clarity_of_message": SUBCATEGORY,
+    },
+    "overall_feedback": {"summary": "", "strengths": [], "areas_to_improve": [], "prioritized_actions": []},
+}
+
+
+def make_client(monkeypatch, calls):
+    async def fake_analyze_video(video_path, audio_path=None):
+        calls.append((video_path, audio_path))
+        return FEEDBACK
+
+    monkeypatch.setattr(analyze.analyzer, "analyze_video", fake_analyze_video)
+    app = FastAPI()
+    app.include_router(analyze.router)
+    return TestClient(app)
+
+
+def test_submit_job_accepts_multipart_video(monkeypatch):
+    calls = []
+    with make_client(monkeypatch, calls) as client:
+        response = client.post(
+            "/analyze/jobs",
+            files={
+                "video": ("talk.mp4", b"\0" * 16, "video/mp4"),
+                "audio": ("talk.mp3", b"\0" * 8, "audio/mpeg"),
+            },
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        status = client.get(f"/analyze/jobs/{job_id}").json()
+        assert status["status"] == "done"
+
+    assert len(calls) == 1
+    video_path, audio_path = calls[0]
+    assert video_path.endswith("talk.mp4")
+    assert audio_path is not None and audio_path.endswith("talk.mp3")
+
+
+def test_submit_job_treats_empty_audio_as_missing(monkeypatch):
+    calls = []
+    with make_client(monkeypatch, calls) as client:
+        response = client.post(
+            "/analyze/jobs",
+            files={"video": ("talk.mp4", b"\0" * 16, "video/mp4")},
+            data={"audio": ""},
+        )
+        assert response.status_code == 202
+
+    assert calls and calls[0][1] is None
+
+
+def test_submit_job_requires_video_or_upload_id(monkeypatch):
+    with make_client(monkeypatch, []) as client:
+        response = client.post("/analyze/jobs", data={"audio": ""})
+    assert response.status_code == 400
+
+
+def test_analyze_video_dryrun_sees_audio(monkeypatch):
+    with make_client(monkeypatch, []) as client:
+        response = client.post(
+            "/analyze/video",
+            params={"dryrun": 1},
+            files={
+                "video": ("x.mp4", b"\0", "video/mp4"),
+                "audio": ("x.mp3", b"\0", "audio/mpeg"),
+            },
+        )
+    assert response.status_code == 200
+    assert response.json()["audio"] is True
+
+
+def test_concurrent_same_name_uploads_get_separate_files(monkeypatch):
+    contents = []
+
+    async def fake_analyze_video(video_path, audio_path=None):
+        # Yield so the other request saves its upload before this one reads its file
+        await asyncio.sleep(0.05)
+        with open(video_path, "rb") as f:
+            contents.append(f.read())
+        return FEEDBACK
+
+    monkeypatch.setattr(analyze.analyzer, "analyze_video", fake_analyze_video)
+    app = FastAPI()
+    app.include_router(analyze.router)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/analyze/video", files={"video": ("talk.mp4", body, "video/mp4")})
+                for body in (b"first", b"second")
+            ))
+
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [200, 200]
+    assert sorted(contents) == [b"first", b"second"]
@@ -0,0 +1,322 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+from app.models import FeedbackResponse
+from app.services import analyzer
+
+from .test_analyze_jobs import FEEDBACK
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("talk.MP4", "video/mp4"),
+    ("talk.avi", "video/x-msvideo"),
+    ("talk.m4v", "video/mp4"),
+    ("talk.mpeg", "video/mpeg"),
+    ("talk.3gp", "video/3gpp"),
+    # Not in the table: falls back to the mimetypes database
+    ("talk.qt", "video/quicktime"),
+    ("talk.unknown-ext", "video/mp4"),
+])
+def test_video_mime_type(path, expected):
+    assert analyzer._mime_type(path, analyzer._VIDEO_MIME, "video/mp4") == expected
+
+
+@pytest.fixture
+def speech_analyzer(monkeypatch):
+    """A SpeechAnalyzer whose Gemini call is replaced by a counting stub."""
+    instance = analyzer.SpeechAnalyzer()
+    instance.generated = []
+
+    async def fake_generate_feedback(video_path, audio_path=None):
+        instance.generated.append(video_path)
+        return {"video": video_path}
+
+    monkeypatch.setattr(instance, "_generate_feedback", fake_generate_feedback)
+    return instance
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "talk.mp4"
+    path.write_bytes(b"video")
+    return str(path)
+
+
+def make_video(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_identical_content_is_served_from_cache(speech_analyzer, tmp_path, video):
+    same_content = make_video(tmp_path, "copy.mp4", b"video")
+
+    async def run():
+        first = await speech_analyzer.analyze_video(video)
+        second = await speech_analyzer.analyze_video(same_content)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert speech_analyzer.generated == [video]
+
+
+def test_expired_cache_entry_is_regenerated(speech_analyzer, video):
+    async def run():
+        await speech_analyzer.analyze_video(video)
+        key = await speech_analyzer._cache_key(video)
+        _, feedback = speech_analyzer._cache[key]
+        speech_analyzer._cache[key] = (time.time() - analyzer.CACHE_TTL_SECONDS - 1, feedback)
+        await speech_analyzer.analyze_video(video)
+
+    asyncio.run(run())
+    assert len(speech_analyzer.generated) == 2
+
+
+def test_least_recently_used_entry_is_evicted(speech_analyzer, monkeypatch, tmp_path):
+    monkeypatch.setattr(analyzer, "CACHE_MAX_ENTRIES", 2)
+    first, second, third = (make_video(tmp_path, f"{n}.mp4", n.encode()) for n in ("a", "b", "c"))
+
+    async def run():
+        for path in (first, second, first, third):
+            await speech_analyzer.analyze_video(path)
+        # second was least recently used when third was added
+        await speech_analyzer.analyze_video(first)
+        await speech_analyzer.analyze_video(second)
+
+    asyncio.run(run())
+    assert speech_analyzer.generated == [first, second, third, second]
+
+
+@pytest.fixture
+def gated_analyzer(speech_analyzer, monkeypatch):
+    """speech_analyzer whose analyses block until `release` is set, then return or raise `outcome`."""
+    speech_analyzer.release = asyncio.Event()
+    speech_analyzer.outcome = None
+
+    async def path_key(video_path, audio_path=None):
+        # No hashing thread, so callers reach the in-flight check in a known order
+        return video_path
+
+    async def gated_generate_feedback(video_path, audio_path=None):
+        speech_analyzer.generated.append(video_path)
+        await speech_analyzer.release.wait()
+        if isinstance(speech_analyzer.outcome, Exception):
+            raise speech_analyzer.outcome
+        return {"video": video_path}
+
+    monkeypatch.setattr(speech_analyzer, "_cache_key", path_key)
+    monkeypatch.setattr(speech_analyzer, "_generate_feedback", gated_generate_feedback)
+    return speech_analyzer
+
+
+async def settle():
+    """Let every ready task run until it blocks."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_identical_calls_share_one_analysis(gated_analyzer, video):
+    async def run():
+        calls = [asyncio.create_task(gated_analyzer.analyze_video(video)) for _ in range(3)]
+        await settle()
+        gated_analyzer.release.set()
+        return await asyncio.gather(*calls)
+
+    results = asyncio.run(run())
+    assert results == [{"video": video}] * 3
+    assert gated_analyzer.generated == [video]
+    assert gated_analyzer._inflight == {}
+
+
+def test_shared_analysis_failure_reaches_every_caller(gated_analyzer, video):
+    gated_analyzer.outcome = RuntimeError("gemini failed")
+
+    async def run():
+        calls = [asyncio.create_task(gated_analyzer.analyze_video(video)) for _ in range(2)]
+        await settle()
+        gated_analyzer.release.set()
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert gated_analyzer.generated == [video]
+    # Failures aren't cached, so the next call tries again
+    assert gated_analyzer._inflight == {}
+    assert gated_analyzer._cache == {}
+
+
+def test_cancelling_first_caller_does_not_cancel_others(gated_analyzer, video):
+    async def run():
+        first = asyncio.create_task(gated_analyzer.analyze_video(video))
+        second = asyncio.create_task(gated_analyzer.analyze_video(video))
+        await settle()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        gated_analyzer.release.set()
+        return await second
+
+    assert asyncio.run(run()) == {"video": video}
+    assert gated_analyzer.generated == [video]
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.store = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis is down")
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis is down")
+        self.store[key] = value
+
+
+def test_redis_hit_skips_gemini_and_fills_local_cache(speech_analyzer, video):
+    speech_analyzer._redis = FakeRedis()
+
+    async def run():
+        key = await speech_analyzer._cache_key(video)
+        speech_analyzer._redis.store[analyzer.REDIS_KEY_PREFIX + key] = orjson.dumps({"from": "redis"})
+        result = await speech_analyzer.analyze_video(video)
+        return key, result
+
+    key, result = asyncio.run(run())
+    assert result == {"from": "redis"}
+    assert speech_analyzer.generated == []
+    assert speech_analyzer._cache_get(key) == {"from": "redis"}
+
+
+def test_redis_failure_falls_back_to_gemini(speech_analyzer, video):
+    speech_analyzer._redis = FakeRedis(fail=True)
+    assert asyncio.run(speech_analyzer.analyze_video(video)) == {"video": video}
+    assert speech_analyzer.generated == [video]
+
+
+def test_redis_miss_is_stored_after_analysis(speech_analyzer, video):
+    speech_analyzer._redis = FakeRedis()
+    asyncio.run(speech_analyzer.analyze_video(video))
+    assert [orjson.loads(value) for value in speech_analyzer._redis.store.values()] == [{"video": video}]
+
+
+def test_batch_unavailable_falls_back_to_individual_analysis(speech_analyzer, monkeypatch, tmp_path):
+    paths = [make_video(tmp_path, f"{n}.mp4", n.encode()) for n in ("a", "b")]
+
+    async def failing_run_batch(inputs, timeout):
+        raise RuntimeError("batch API unavailable")
+
+    monkeypatch.setattr(speech_analyzer, "_run_batch", failing_run_batch)
+    results = asyncio.run(speech_analyzer.analyze_videos_batch([(path, None) for path in paths]))
+    assert results == [{"video": path} for path in paths]
+    assert speech_analyzer.generated == paths
+
+
+def test_batch_gaps_are_filled_individually(speech_analyzer, monkeypatch, tmp_path):
+    paths = [make_video(tmp_path, f"{n}.mp4", n.encode()) for n in ("a", "b", "c")]
+    submitted = []
+
+    async def partial_run_batch(inputs, timeout):
+        submitted.extend(video_path for video_path, _ in inputs)
+        return [{"batch": inputs[0][0]}, None]
+
+    monkeypatch.setattr(speech_analyzer, "_run_batch", partial_run_batch)
+
+    async def run():
+        await speech_analyzer.analyze_video(paths[0])
+        return await speech_analyzer.analyze_videos_batch([(path, None) for path in paths])
+
+    results = asyncio.run(run())
+    assert results == [{"video": paths[0]}, {"batch": paths[1]}, {"video": paths[2]}]
+    # The cached video isn't resubmitted; the batch's gap is analyzed interactively
+    assert submitted == paths[1:]
+    assert speech_analyzer.generated == [paths[0], paths[2]]
+
+
+class FakeBatches:
+    """Stands in for client.aio.batches; jobs stay in `state` and finish with `responses`."""
+
+    def __init__(self, state, responses=()):
+        self.state = state
+        self.responses = list(responses)
+        self.cancelled = []
+
+    def _job(self):
+        return SimpleNamespace(name="batches/1", state=self.state, dest=SimpleNamespace(inlined_responses=self.responses))
+
+    async def create(self, **kwargs):
+        return self._job()
+
+    async def get(self, name):
+        return self._job()
+
+    async def cancel(self, name):
+        self.cancelled.append(name)
+
+
+@pytest.fixture
+def batch_analyzer(speech_analyzer, monkeypatch):
+    """speech_analyzer with Gemini file uploads and deletes stubbed out."""
+    speech_analyzer.deleted = []
+
+    async def fake_upload_inputs(video_path, audio_path=None):
+        return SimpleNamespace(name=f"files/{video_path}", uri=video_path), None
+
+    async def fake_delete_file(file):
+        speech_analyzer.deleted.append(file.name)
+
+    monkeypatch.setattr(speech_analyzer, "_upload_inputs", fake_upload_inputs)
+    monkeypatch.setattr(speech_analyzer, "_delete_file", fake_delete_file)
+    return speech_analyzer
+
+
+def test_partially_succeeded_batch_keeps_its_successes(batch_analyzer, monkeypatch):
+    batches = FakeBatches("JOB_STATE_PARTIALLY_SUCCEEDED", [
+        SimpleNamespace(error=None, response=SimpleNamespace(text=orjson.dumps(FEEDBACK).decode())),
+        SimpleNamespace(error="quota", response=None),
+    ])
+    monkeypatch.setattr(batch_analyzer, "client", SimpleNamespace(aio=SimpleNamespace(batches=batches)))
+
+    results = asyncio.run(batch_analyzer._run_batch([("a.mp4", None), ("b.mp4", None)], timeout=60))
+    assert results[0] == FeedbackResponse.model_validate(FEEDBACK).model_dump()
+    assert results[1] is None
+    assert batches.cancelled == []
+    assert batch_analyzer.deleted == ["files/a.mp4", "files/b.mp4"]
+
+
+def test_timed_out_batch_is_cancelled_before_files_are_deleted(batch_analyzer, monkeypatch):
+    batches = FakeBatches("JOB_STATE_RUNNING")
+    monkeypatch.setattr(batch_analyzer, "client", SimpleNamespace(aio=SimpleNamespace(batches=batches)))
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(batch_analyzer._run_batch([("a.mp4", None)], timeout=-1))
+    assert batches.cancelled == ["batches/1"]
+    assert batch_analyzer.deleted == ["files/a.mp4"]
+
+
+def test_batch_reuses_results_cached_in_redis(speech_analyzer, monkeypatch, tmp_path):
+    paths = [make_video(tmp_path, f"{n}.mp4", n.encode()) for n in ("a", "b")]
+    speech_analyzer._redis = FakeRedis()
+    submitted = []
+
+    async def fake_run_batch(inputs, timeout):
+        submitted.extend(video_path for video_path, _ in inputs)
+        return [{"batch": video_path} for video_path, _ in inputs]
+
+    monkeypatch.setattr(speech_analyzer, "_run_batch", fake_run_batch)
+
+    async def run():
+        key = await speech_analyzer._cache_key(paths[0])
+        speech_analyzer._redis.store[analyzer.REDIS_KEY_PREFIX + key] = orjson.dumps({"from": "redis"})
+        return await speech_analyzer.analyze_videos_batch([(path, None) for path in paths])
+
+    assert asyncio.run(run()) == [{"from": "redis"}, {"batch": paths[1]}]
+    assert submitted == paths[1:]
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import chat
+
+
+@pytest.fixture
+def feedback_chat(monkeypatch):
+    instance = chat.FeedbackChat()
+    # Creating a Gemini chat is local, but keep tests independent of the client entirely
+    monkeypatch.setattr(instance.client.aio.chats, "create", lambda **kwargs: object())
+    return instance
+
+
+def test_idle_conversations_expire(feedback_chat):
+    stale = feedback_chat.start_conversation({})
+    feedback_chat.conversations[stale]["last_used"] = time.time() - chat.CONVERSATION_TTL_SECONDS - 1
+    fresh = feedback_chat.start_conversation({})
+
+    assert stale not in feedback_chat.conversations
+    assert fresh in feedback_chat.conversations
+
+
+def test_least_recently_used_conversation_is_evicted(feedback_chat, monkeypatch):
+    monkeypatch.setattr(chat, "MAX_CONVERSATIONS", 2)
+    first = feedback_chat.start_conversation({})
+    second = feedback_chat.start_conversation({})
+    feedback_chat.conversations.move_to_end(first)
+    third = feedback_chat.start_conversation({})
+
+    assert list(feedback_chat.conversations) == [first, third]
+    assert second not in feedback_chat.conversations
+
+
+def test_message_to_expired_conversation_is_rejected(feedback_chat):
+    conversation_id = feedback_chat.start_conversation({})
+    feedback_chat.conversations[conversation_id]["last_used"] = time.time() - chat.CONVERSATION_TTL_SECONDS - 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(feedback_chat.send_message(conversation_id, "hello"))
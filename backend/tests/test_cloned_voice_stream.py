@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import speech_improvement
+from app.services.elevenlabs_service import ClonedVoiceStream
+
+
+def fake_client(deleted):
+    return SimpleNamespace(voices=SimpleNamespace(ivc=SimpleNamespace(delete=deleted.append)))
+
+
+def test_voice_is_deleted_once_when_exhausted():
+    deleted = []
+    stream = ClonedVoiceStream(fake_client(deleted), "voice", (chunk for chunk in [b"a", b"b"]))
+    assert b"".join(stream) == b"ab"
+    stream.close()
+    assert deleted == ["voice"]
+
+
+def test_voice_is_deleted_when_closed_before_iterating():
+    deleted = []
+    started = []
+
+    def chunks():
+        started.append(True)
+        yield b"a"
+
+    stream = ClonedVoiceStream(fake_client(deleted), "voice", chunks())
+    stream.close()
+    assert deleted == ["voice"]
+    assert not started
+    assert list(stream) == []
+
+
+def test_voice_is_deleted_when_generation_fails():
+    deleted = []
+
+    def chunks():
+        yield b"a"
+        raise RuntimeError("tts failed")
+
+    stream = ClonedVoiceStream(fake_client(deleted), "voice", chunks())
+    assert next(stream) == b"a"
+    with pytest.raises(RuntimeError):
+        next(stream)
+    assert deleted == ["voice"]
+
+
+def test_clone_and_improve_raw_deletes_voice(monkeypatch):
+    deleted = []
+
+    async def fake_workflow(audio_path, improvement_focus, **kwargs):
+        return {
+            "original_transcription": "hello",
+            "improved_content": {},
+            "improved_audio_stream": ClonedVoiceStream(fake_client(deleted), "voice", (chunk for chunk in [b"mp3"])),
+        }
+
+    monkeypatch.setattr(speech_improvement.elevenlabs_service, "streaming_speech_improvement_workflow", fake_workflow)
+    app = FastAPI()
+    app.include_router(speech_improvement.router)
+    with TestClient(app) as client:
+        response = client.post("/speech/clone-and-improve/raw", params={"filename": "speech.mp3"}, content=b"audio")
+
+    assert response.status_code == 200
+    assert response.content == b"mp3"
+    assert deleted == ["voice"]
@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import speech_improvement
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+needs_zstandard = pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+
+AUDIO = bytes(range(256)) * 4096
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(speech_improvement, "UPLOADS_DIR", tmp_path)
+    received = []
+
+    async def fake_transcribe_audio(audio_path, **kwargs):
+        with open(audio_path, "rb") as f:
+            received.append(f.read())
+        return "transcript"
+
+    monkeypatch.setattr(speech_improvement.elevenlabs_service, "transcribe_audio", fake_transcribe_audio)
+    app = FastAPI()
+    app.include_router(speech_improvement.router)
+    with TestClient(app) as test_client:
+        test_client.received = received
+        yield test_client
+
+
+def post_raw(client, body, **headers):
+    return client.post(
+        "/speech/transcribe/raw",
+        params={"filename": "speech.wav"},
+        content=body,
+        headers={"Content-Type": "audio/wav", **headers},
+    )
+
+
+@needs_zstandard
+def test_zstd_body_round_trips(client):
+    response = post_raw(client, zstandard.ZstdCompressor().compress(AUDIO), **{"Content-Encoding": "zstd"})
+    assert response.status_code == 200
+    assert client.received == [AUDIO]
+
+
+@needs_zstandard
+def test_zstd_body_over_the_size_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(speech_improvement, "MAX_DECOMPRESSED_UPLOAD_BYTES", len(AUDIO) - 1)
+    response = post_raw(client, zstandard.ZstdCompressor().compress(AUDIO), **{"Content-Encoding": "zstd"})
+    assert response.status_code == 413
+    assert client.received == []
+    assert not list(speech_improvement.UPLOADS_DIR.iterdir())
+
+
+@needs_zstandard
+def test_truncated_zstd_body_is_rejected(client):
+    body = zstandard.ZstdCompressor().compress(AUDIO)
+    response = post_raw(client, body[: len(body) // 2], **{"Content-Encoding": "zstd"})
+    assert response.status_code == 400
+    assert client.received == []
+
+
+def test_identity_body_is_saved_as_is(client):
+    response = post_raw(client, AUDIO)
+    assert response.status_code == 200
+    assert client.received == [AUDIO]
+
+
+def test_concurrent_same_name_multipart_uploads_get_separate_files(monkeypatch):
+    received = []
+
+    async def fake_transcribe_audio(audio_path, **kwargs):
+        # Yield so the other request saves its upload before this one reads its file
+        await asyncio.sleep(0.05)
+        with open(audio_path, "rb") as f:
+            received.append(f.read())
+        return "transcript"
+
+    monkeypatch.setattr(speech_improvement.elevenlabs_service, "transcribe_audio", fake_transcribe_audio)
+    app = FastAPI()
+    app.include_router(speech_improvement.router)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/speech/transcribe", files={"audio": ("speech.mp3", body, "audio/mpeg")})
+                for body in (b"first", b"second")
+            ))
+
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [200, 200]
+    assert sorted(received) == [b"first", b"second"]
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import uploads
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(uploads, "UPLOADS_DIR", tmp_path)
+    return uploads.UploadStore()
+
+
+def test_parts_are_assembled_in_order(store):
+    async def run():
+        upload_id = store.create("talk.mp4")
+        await store.write_part(upload_id, 1, chunks(b"world"))
+        await store.write_part(upload_id, 0, chunks(b"hello ", b""))
+        assert await store.complete(upload_id, part_count=2) == 11
+        return store.take(upload_id)
+
+    path = asyncio.run(run())
+    assert path.read_bytes() == b"hello world"
+
+
+def test_writes_and_complete_conflict_with_assembly(store):
+    async def run():
+        upload_id = store.create("talk.mp4")
+        await store.write_part(upload_id, 0, chunks(b"data"))
+        # complete() marks the upload before handing assembly to a thread, so these run mid-assembly
+        return await asyncio.gather(
+            store.complete(upload_id),
+            store.write_part(upload_id, 1, chunks(b"late")),
+            store.complete(upload_id),
+            return_exceptions=True,
+        )
+
+    size, late_write, second_complete = asyncio.run(run())
+    assert size == 4
+    assert isinstance(late_write, ValueError)
+    assert isinstance(second_complete, ValueError)
+
+
+def test_prune_uses_last_activity_and_skips_busy_uploads(store):
+    idle = store.create("idle.mp4")
+    busy = store.create("busy.mp4")
+    old = time.time() - uploads.UPLOAD_TTL_SECONDS - 1
+    for upload_id in (idle, busy):
+        store.uploads[upload_id]["created"] = old
+        store.uploads[upload_id]["last_activity"] = old
+    store.uploads[busy]["writes"] = 1
+
+    store._prune_uploads()
+
+    assert idle not in store.uploads
+    assert busy in store.uploads